@@ -35,7 +35,16 @@ from invenio_db import db
 from invenio_records import Record
 from invenio_records.errors import MissingModelError
 from invenio_workflows import ObjectStatus, resume
+from invenio_workflows.errors import WorkflowsMissingObject
 from invenio_workflows.proxies import workflow_object_class, workflows
+from invenio_workflows.signals import (
+    workflow_object_after_save,
+    workflow_object_before_save,
+)
+from jsonpatch import JsonPatch, JsonPatchConflict
+from jsonpointer import JsonPointer
+from sqlalchemy.orm import defer, joinedload
+from sqlalchemy.orm.exc import NoResultFound
 from workflow.engine_db import WorkflowStatus
 
 from .indexer import WorkflowIndexer
@@ -43,15 +52,41 @@ from .proxies import actions
 
 
 def record_to_index(record):
-    """Index the workflow record into desired index/doc_type."""
+    """Index the workflow record into desired index/doc_type.
+
+    Records in one of ``WORKFLOWS_UI_COLD_STATUSES`` go to the cold index of
+    their data type, when it has one.
+    """
     config = current_app.config['WORKFLOWS_UI_DATA_TYPES'].get(
         record["_workflow"]["data_type"]
     )
     if not config:
         return None, None
+    if config.get('cold_search_index') and record["_workflow"]["status"] in \
+            current_app.config['WORKFLOWS_UI_COLD_STATUSES']:
+        return (
+            config['cold_search_index'],
+            config.get('cold_search_type', config.get('search_type')),
+        )
     return config.get('search_index'), config.get('search_type')
 
 
+def record_to_indices(record):
+    """Get all the index/doc_type the workflow record may be indexed into."""
+    config = current_app.config['WORKFLOWS_UI_DATA_TYPES'].get(
+        record["_workflow"]["data_type"]
+    )
+    if not config:
+        return []
+    indices = [(config.get('search_index'), config.get('search_type'))]
+    if config.get('cold_search_index'):
+        indices.append((
+            config['cold_search_index'],
+            config.get('cold_search_type', config.get('search_type')),
+        ))
+    return indices
+
+
 def index(method=None, delete=False):
     """Apply to API methods that need to change the index for the object."""
     # Check if we shall save arguments and recreate decorator
@@ -83,8 +118,18 @@ class WorkflowUIRecord(Record):
 
     indexer = WorkflowIndexer(
         record_to_index=record_to_index,
+        record_to_indices=record_to_indices,
     )
 
+    # Record fields built from columns that can be left unloaded.
+    deferred_fields = {
+        'metadata': 'data',
+        '_extra_data': 'extra_data',
+    }
+
+    # Top-level fields that can be changed with a JSON Patch.
+    patchable_fields = frozenset(['_workflow', 'metadata', '_extra_data'])
+
     def __init__(self, *args, **kwargs):
         """Represent a workflow object record for indexing."""
         try:
@@ -105,14 +150,97 @@ class WorkflowUIRecord(Record):
         return cls(record, workflow=workflow_object, **kwargs)
 
     @classmethod
-    def get_record(cls, id_, with_deleted=False):
+    def get_record(cls, id_, with_deleted=False, fields=None):
         """Get record instance.
 
         Raises database exception if record does not exists.
+
+        :param fields: Deferred fields of the record to load among
+            ``metadata`` and ``_extra_data``, defaults to all. The columns
+            of the others are not loaded; such a partial record must not
+            be committed.
         """
         with db.session.no_autoflush:
-            obj = workflow_object_class.get(id_)
-            return cls(cls.record_from_object(obj), workflow=obj)
+            if fields is None:
+                obj = workflow_object_class.get(id_)
+            else:
+                model = workflow_object_class.dbmodel
+                query = model.query.filter(model.id == id_).options(
+                    *cls._deferred_columns(fields))
+                try:
+                    obj = workflow_object_class(query.one())
+                except NoResultFound:
+                    raise WorkflowsMissingObject(
+                        'No object for id {0}'.format(id_))
+            return cls(cls.record_from_object(obj, fields=fields),
+                       workflow=obj)
+
+    @classmethod
+    def get_records(cls, ids, fields=None):
+        """Get several record instances with a single query.
+
+        The workflow of the objects is loaded by the same query, and
+        missing records are skipped.
+
+        :param ids: Identifiers of the records, in the wanted order.
+        :param fields: Deferred fields of the records to load, see
+            :meth:`get_record`.
+        """
+        model = workflow_object_class.dbmodel
+        with db.session.no_autoflush:
+            query = model.query.filter(model.id.in_(ids)).options(
+                joinedload(model.workflow),
+                *cls._deferred_columns(fields)
+            )
+            objs = {
+                obj.id: workflow_object_class(obj) for obj in query
+            }
+            return [
+                cls(cls.record_from_object(objs[id_], fields=fields),
+                    workflow=objs[id_])
+                for id_ in ids if id_ in objs
+            ]
+
+    @classmethod
+    def iter_records(cls, ids, fields=None, chunk_size=100):
+        """Iterate over record instances, querying them in chunks.
+
+        Only ``chunk_size`` records are loaded at a time, so that the first
+        ones can be used before the others are queried.
+
+        :param ids: Identifiers of the records, in the wanted order.
+        :param fields: Deferred fields of the records to load, see
+            :meth:`get_record`.
+        :param chunk_size: Number of records loaded by each query.
+        """
+        for start in range(0, len(ids), chunk_size):
+            for record in cls.get_records(
+                    ids[start:start + chunk_size], fields=fields):
+                yield record
+
+    @classmethod
+    def _deferred_columns(cls, fields=None):
+        """Get the query options deferring the columns not in fields."""
+        if fields is None:
+            return []
+        model = workflow_object_class.dbmodel
+        return [
+            defer(getattr(model, column))
+            for field, column in cls.deferred_fields.items()
+            if field not in fields
+        ]
+
+    @classmethod
+    def get_modified(cls, id_):
+        """Get the modification date of a record without loading it.
+
+        :returns: The modification date, or ``None`` if the record does not
+            exist.
+        """
+        model = workflow_object_class.dbmodel
+        return db.session.query(model.modified).filter(
+            model.id == id_
+        ).scalar()
 
     def commit(self):
         """Commit a change to the record state."""
@@ -132,12 +260,15 @@ class WorkflowUIRecord(Record):
         return self
 
     @staticmethod
-    def record_from_object(workflow_object):
+    def record_from_object(workflow_object, fields=None):
         """Build data from workflow object.
 
         NOTE: This entire function may in principle be in
         workflow_object_class model as a to_dict() kind of function of
         the model.
+
+        :param fields: Deferred fields of the record to build among
+            ``metadata`` and ``_extra_data``, defaults to all.
         """
         record = {}
         record["id"] = workflow_object.id
@@ -174,28 +305,82 @@ class WorkflowUIRecord(Record):
 
             _workflow["workflow_class"] = workflow_object.workflow.name
 
-        if isinstance(workflow_object.data, dict):
-            record.update({"metadata": workflow_object.data})
-        if isinstance(workflow_object.extra_data, dict):
-            record.update({"_extra_data": workflow_object.extra_data})
+        if fields is None or 'metadata' in fields:
+            if isinstance(workflow_object.data, dict):
+                record.update({"metadata": workflow_object.data})
+        if fields is None or '_extra_data' in fields:
+            if isinstance(workflow_object.extra_data, dict):
+                record.update({"_extra_data": workflow_object.extra_data})
 
         record["_workflow"] = _workflow
         return record
 
-    def update_model(self):
-        """Update model from current record."""
+    def update_model(self, fields=None):
+        """Update model from current record.
+
+        With ``fields`` only the columns built from those top-level fields
+        are assigned and the model is flushed without flagging the other
+        JSON columns as modified, so SQLAlchemy writes only what changed.
+
+        :param fields: Top-level fields of the record to update the model
+            from, defaults to all.
+        """
         if self.model is None:
             raise MissingModelError()
 
-        self.workflow.data_type = self["_workflow"]["data_type"]
-        self.workflow.status = ObjectStatus[self["_workflow"]["status"]]
-        self.workflow.id_user = self["_workflow"]["id_user"]
-        self.workflow.id_parent = self["_workflow"]["id_parent"]
-        self.workflow.id_workflow = self["_workflow"]["id_workflow"]
-        self.workflow.callback_pos = self["_workflow"]["workflow_position"]
-        self.workflow.data = self['metadata']
-        self.workflow.extra_data = self['_extra_data']
-        self.workflow.save()
+        if fields is None or '_workflow' in fields:
+            self.workflow.data_type = self["_workflow"]["data_type"]
+            self.workflow.status = ObjectStatus[self["_workflow"]["status"]]
+            self.workflow.id_user = self["_workflow"]["id_user"]
+            self.workflow.id_parent = self["_workflow"]["id_parent"]
+            self.workflow.id_workflow = self["_workflow"]["id_workflow"]
+            self.workflow.callback_pos = \
+                self["_workflow"]["workflow_position"]
+        if fields is None or 'metadata' in fields:
+            self.workflow.data = self['metadata']
+        if fields is None or '_extra_data' in fields:
+            self.workflow.extra_data = self['_extra_data']
+
+        if fields is None:
+            self.workflow.save()
+            return
+        # The modification date is bumped by the column's ``onupdate``.
+        with db.session.begin_nested():
+            workflow_object_before_save.send(self.workflow)
+        workflow_object_after_save.send(self.workflow)
+
+    def apply_patch(self, patch):
+        """Apply a JSON Patch (RFC 6902) and save the changed fields.
+
+        Only the top-level fields touched by the patch are copied, and only
+        the corresponding columns of the model are updated.
+
+        :param patch: List of JSON Patch operations.
+        :raises jsonpatch.JsonPatchConflict: If the patch touches anything
+            but ``_workflow``, ``metadata`` or ``_extra_data``.
+        """
+        patch = JsonPatch(patch)
+        fields = set()
+        for operation in patch:
+            for key in ('path', 'from'):
+                if key in operation:
+                    parts = JsonPointer(operation[key]).parts
+                    if not parts or parts[0] not in self.patchable_fields:
+                        raise JsonPatchConflict(
+                            'Cannot patch {0}.'.format(operation[key]))
+                    fields.add(parts[0])
+
+        data = dict(self)
+        for field in fields:
+            if field in data:
+                data[field] = copy.deepcopy(data[field])
+        data = patch.apply(data, in_place=True)
+
+        self.clear()
+        self.update(data)
+        with db.session.begin_nested():
+            self.update_model(fields=fields)
+        return self
 
     def edit(self, *args, **kwargs):
         """Edit and save record (automatically indexed)."""
@@ -21,7 +21,33 @@
 
 from __future__ import absolute_import, print_function
 
-from invenio_workflows_ui.search import terms_filter
+from importlib import import_module
+
+from elasticsearch import VERSION as ES_VERSION
+
+from invenio_workflows_ui.search import range_filter, terms_filter
+
+_DATE_HISTOGRAM_INTERVAL = (
+    'calendar_interval' if ES_VERSION[:2] >= (7, 2) else 'interval'
+)
+
+
+def _binary_serializers(suffix):
+    """Get the MessagePack and CBOR serializers whose package is installed.
+
+    :param suffix: Suffix of the serializer names (e.g. ``serializer``).
+    """
+    serializers = {}
+    for module, media_type, prefix in (
+            ('msgpack', 'application/msgpack', 'msgpack'),
+            ('cbor2', 'application/cbor', 'cbor')):
+        try:
+            import_module(module)
+        except ImportError:
+            continue
+        serializers[media_type] = (
+            'invenio_workflows_ui.serializers:{0}_{1}'.format(prefix, suffix))
+    return serializers
 
 
 WORKFLOWS_UI_URL = "/workflows"
@@ -30,35 +56,87 @@ WORKFLOWS_UI_API_CLASS = "invenio_workflows_ui.api:WorkflowUIRecord"
 
 WORKFLOWS_UI_TEMPLATE_CONTEXT_PROCESSORS = []
 WORKFLOWS_UI_REST_ENDPOINT = dict(
-    workflow_object_serializers={
+    workflow_object_serializers=dict({
         'application/json': ('invenio_workflows_ui.serializers'
                              ':json_serializer'),
-    },
-    search_serializers={
+    }, **_binary_serializers('serializer')),
+    search_serializers=dict({
         'application/json': ('invenio_workflows_ui.serializers'
                              ':json_search_serializer'),
+        'application/vnd.workflows-ui.raw+json': (
+            'invenio_workflows_ui.serializers:json_search_raw_serializer'),
+    }, **_binary_serializers('search_serializer')),
+    search_serializers_aliases={
+        'json': 'application/json',
+        'raw': 'application/vnd.workflows-ui.raw+json',
     },
-    action_serializers={
+    action_serializers=dict({
         'application/json': ('invenio_workflows_ui.serializers'
                              ':json_action_serializer'),
-    },
+    }, **_binary_serializers('action_serializer')),
     bulk_action_serializers={
         'application/json': ('invenio_workflows_ui.serializers'
                              ':json_action_serializer'),
     },
-    file_serializers={
+    file_serializers=dict({
         'application/json': ('invenio_workflows_ui.serializers'
                              ':json_file_serializer'),
+    }, **_binary_serializers('file_serializer')),
+    multi_search_serializers={
+        'application/json': ('invenio_workflows_ui.serializers'
+                             ':json_multi_search_serializer'),
+    },
+    export_serializers={
+        'application/x-ndjson': ('invenio_workflows_ui.serializers'
+                                 ':ndjson_stream_serializer'),
+        'text/csv': ('invenio_workflows_ui.serializers'
+                     ':csv_stream_serializer'),
+    },
+    export_serializers_aliases={
+        'ndjson': 'application/x-ndjson',
+        'csv': 'text/csv',
+    },
+    export_default_media_type='application/x-ndjson',
+    summary_serializers={
+        'application/json': ('invenio_workflows_ui.serializers'
+                             ':json_summary_serializer'),
+    },
+    batch_serializers={
+        'application/json': ('invenio_workflows_ui.serializers'
+                             ':json_stream_serializer'),
+        'application/x-ndjson': ('invenio_workflows_ui.serializers'
+                                 ':ndjson_stream_serializer'),
     },
     list_route='/workflows/',
+    multi_search_route='/workflows/search',
+    export_route='/workflows/export',
+    summary_route='/workflows/summary',
+    batch_route='/workflows/batch',
     item_route='/workflows/<object_id>',
     file_list_route='/workflows/<object_id>/files',
     file_item_route='/workflows/<object_id>/files/<path:key>',
     search_index="workflows",
     default_media_type='application/json',
     max_result_window=10000,
+    search_cache_timeout=5,
+    track_total_hits=10000,
+    search_timeout='10s',
+    search_terminate_after=None,
+    summary_cache_timeout=30,
+    item_cache_timeout=60,
+    batch_max_size=1000,
+    multi_search_max_size=10,
 )
 
+WORKFLOWS_UI_REST_EXPORT_CSV_FIELDS = [
+    'id',
+    '_workflow.status',
+    '_workflow.data_type',
+    '_workflow.workflow_name',
+    '_created',
+    '_updated',
+]
+
 WORKFLOWS_UI_DATA_TYPES = dict(
     workflow=dict(
         search_index='workflows',
@@ -66,12 +144,28 @@ WORKFLOWS_UI_DATA_TYPES = dict(
     ),
 )
 
+WORKFLOWS_UI_COLD_STATUSES = ['COMPLETED']
+
+WORKFLOWS_UI_COLD_SOURCE_EXCLUDES = ['_extra_data']
+
+WORKFLOWS_UI_LIST_INDEX_FIELDS = [
+    'id',
+    '_workflow',
+    '_created',
+    '_updated',
+    'metadata.title',
+]
+
 WORKFLOWS_UI_REST_FACETS = {
     "workflows": {
         "filters": {
             "status": terms_filter('_workflow.status'),
             "data_type": terms_filter('_workflow.data_type'),
             "workflow_name": terms_filter('_workflow.workflow_name'),
+            "created_after": range_filter('_created', 'gte'),
+            "created_before": range_filter('_created', 'lt'),
+            "updated_after": range_filter('_updated', 'gte'),
+            "updated_before": range_filter('_updated', 'lt'),
         },
         "aggs": {
             "status": {
@@ -92,10 +186,69 @@ WORKFLOWS_UI_REST_FACETS = {
                     "size": 20
                 }
             },
+            "updated": {
+                "date_range": {
+                    "field": "_updated",
+                    "ranges": [
+                        {"key": "last_hour", "from": "now-1h"},
+                        {"key": "last_day", "from": "now-1d"},
+                        {"key": "last_week", "from": "now-1w"},
+                        {"key": "older", "to": "now-1w"},
+                    ]
+                }
+            },
+            "created_histogram": {
+                "date_histogram": {
+                    "field": "_created",
+                    _DATE_HISTOGRAM_INTERVAL: "day",
+                    "min_doc_count": 1,
+                }
+            },
+            "updated_histogram": {
+                "date_histogram": {
+                    "field": "_updated",
+                    _DATE_HISTOGRAM_INTERVAL: "day",
+                    "min_doc_count": 1,
+                }
+            },
         }
     }
 }
 
+WORKFLOWS_UI_REST_QUERY_GUARDS = dict(
+    max_clauses=100,
+    regexps='reject',
+    max_wildcards=5,
+    wildcards='reject',
+)
+
+WORKFLOWS_UI_REST_DEFAULT_AGGS = {
+    "workflows": ["status", "data_type", "workflow_name"],
+}
+
+WORKFLOWS_UI_REST_SUMMARY_AGGS = {
+    "workflows": [
+        ("status", {
+            "terms": {
+                "field": "_workflow.status",
+                "size": 20
+            }
+        }),
+        ("data_type", {
+            "terms": {
+                "field": "_workflow.data_type",
+                "size": 20
+            }
+        }),
+        ("workflow_name", {
+            "terms": {
+                "field": "_workflow.workflow_name",
+                "size": 20
+            }
+        }),
+    ]
+}
+
 WORKFLOWS_UI_REST_SORT_OPTIONS = {
     "workflows": {
         "bestmatch": {
@@ -106,7 +259,7 @@ WORKFLOWS_UI_REST_SORT_OPTIONS = {
         },
         "mostrecent": {
             "title": 'Most recent',
-            "fields": ['_workflow.modified'],
+            "fields": ['_updated'],
             "default_order": 'desc',
             "order": 2,
         },
@@ -121,7 +274,25 @@ WORKFLOWS_UI_REST_DEFAULT_SORT = {
 }
 
 
+WORKFLOWS_UI_JSON_BACKEND = 'flask'
+
+WORKFLOWS_UI_REST_COMPRESSION_ENCODINGS = ['br', 'gzip']
+
+WORKFLOWS_UI_REST_COMPRESSION_LEVELS = {
+    'br': 4,
+    'gzip': 6,
+}
+
+WORKFLOWS_UI_REST_COMPRESSION_MIN_SIZE = 1024
+
+WORKFLOWS_UI_REST_COMPRESSION_FLUSH_SIZE = 8192
+
 WORKFLOWS_UI_CACHE_PREFIX = "WorkflowsUI::"
+
+WORKFLOWS_UI_OBJECT_MODIFIED_CACHE_TIMEOUT = 60
+
+WORKFLOWS_UI_SEARCH_REFRESH_INTERVAL = 5
+
 WORKFLOWS_UI_LIST_TEMPLATE = "invenio_workflows_ui/list.html"
 WORKFLOWS_UI_DETAILS_TEMPLATE = "invenio_workflows_ui/details.html"
 WORKFLOWS_UI_INDEX_TEMPLATE = "invenio_workflows_ui/index.html"
@@ -21,6 +21,56 @@
 
 from __future__ import absolute_import, print_function
 
+from invenio_rest.errors import RESTException, SameContentException
+
 
 class WorkflowUIError(Exception):
     """Base exception for WorkflowUI."""
+
+
+class QueryTooComplexRESTError(RESTException):
+    """Query rejected by the query cost guards."""
+
+    code = 400
+    description = 'The query is too complex.'
+
+
+class PatchJSONFailureRESTError(RESTException):
+    """Failed to apply a JSON Patch."""
+
+    code = 400
+    description = 'Could not apply JSON Patch to the workflow object.'
+
+
+class InvalidBatchRESTError(RESTException):
+    """Invalid list of workflow object identifiers."""
+
+    code = 400
+    description = 'A list of workflow object ids is expected.'
+
+
+class InvalidMultiSearchRESTError(RESTException):
+    """Invalid searches of a multi-search request."""
+
+    code = 400
+    description = 'A JSON object of named searches is expected.'
+
+
+class SerializerNotAvailableRESTError(RESTException):
+    """Serializer whose optional dependency is not installed."""
+
+    code = 406
+    description = 'The requested format is not available.'
+
+
+class SameWeakContentException(SameContentException):
+    """304 Same Content exception of a resource with a weak ETag."""
+
+    def get_response(self, environ=None):
+        """Get a list of headers."""
+        response = super(SameWeakContentException, self).get_response(
+            environ=environ
+        )
+        if self.etag is not None:
+            response.set_etag(self.etag, weak=True)
+        return response
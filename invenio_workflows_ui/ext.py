@@ -26,6 +26,8 @@
 
 from __future__ import absolute_import, print_function
 
+import time
+
 import pkg_resources
 
 from . import config
@@ -60,12 +62,12 @@ class _WorkflowsUIState(object):
             if k.startswith('WORKFLOWS_UI_'):
                 app.config.setdefault(k, getattr(config, k))
 
-    def set(self, key, value):
+    def set(self, key, value, timeout=None):
         """Store value in cache by key."""
         if self.cache:
             self.cache.set(
                 self.app.config['WORKFLOWS_UI_CACHE_PREFIX'] +
-                str(key), value
+                str(key), value, timeout=timeout
             )
 
     def get(self, key):
@@ -86,6 +88,61 @@ class _WorkflowsUIState(object):
                 str(key)
             )
 
+    def inc(self, key):
+        """Atomically increment a counter in cache by key."""
+        if self.cache:
+            return self.cache.inc(
+                self.app.config['WORKFLOWS_UI_CACHE_PREFIX'] +
+                str(key)
+            )
+
+    @property
+    def search_generation(self):
+        """Current generation of the cached search responses."""
+        return self.get('search_generation') or 0
+
+    @property
+    def search_cache_settled(self):
+        """Whether search responses can be cached.
+
+        Writes become visible to searches only after the index is refreshed,
+        so responses are not cached during the
+        ``WORKFLOWS_UI_SEARCH_REFRESH_INTERVAL`` seconds following an
+        invalidation, as they might not contain the last changes yet.
+        """
+        invalidated = self.get('search_invalidated')
+        return invalidated is None or time.time() - invalidated >= \
+            self.app.config['WORKFLOWS_UI_SEARCH_REFRESH_INTERVAL']
+
+    def invalidate_search_cache(self):
+        """Invalidate all cached search responses.
+
+        Bumps the generation which is part of every search cache key, so
+        that entries stored before the bump are not read anymore and expire.
+        """
+        if self.cache:
+            self.set('search_invalidated', time.time(), timeout=0)
+            self.inc('search_generation')
+
+    def object_modified(self, object_id):
+        """Modification date of a workflow object, cached.
+
+        :returns: The modification date, or ``None`` if the object does not
+            exist.
+        """
+        key = 'modified:{0}'.format(object_id)
+        modified = self.get(key)
+        if modified is None:
+            modified = self.workflow_api_class.get_modified(object_id)
+            if modified is not None:
+                self.set(key, modified, timeout=self.app.config[
+                    'WORKFLOWS_UI_OBJECT_MODIFIED_CACHE_TIMEOUT'])
+        return modified
+
+    def invalidate_object(self, object_id):
+        """Invalidate the cached modification date of a workflow object."""
+        self.delete('modified:{0}'.format(object_id))
+
     def register_action(self, name, action):
         """Register an action to be showed in the actions list."""
         assert name not in self.actions
@@ -113,7 +170,8 @@ class InvenioWorkflowsUIREST(object):
                                   cache=kwargs.get('cache'))
         app.register_blueprint(rest.create_blueprint(
             app.config['WORKFLOWS_UI_REST_ENDPOINT'],
-            app.config['WORKFLOWS_UI_TEMPLATE_CONTEXT_PROCESSORS']
+            app.config['WORKFLOWS_UI_TEMPLATE_CONTEXT_PROCESSORS'],
+            app_config=app.config,
         ))
         app.extensions['invenio-workflows-ui'] = state
         return state
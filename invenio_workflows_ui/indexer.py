@@ -24,16 +24,56 @@ from __future__ import absolute_import, print_function
 import pytz
 
 from elasticsearch import VERSION as ES_VERSION
+from flask import current_app
+from invenio_db import db
 from invenio_indexer.api import RecordIndexer
 
+from .proxies import current_workflows_ui
+from .utils import get_fields, pop_field
+
+# Key of the session info holding the previous values of the fields
+# deciding the index of the changed workflow objects, by object id.
+PREVIOUS_FIELDS_KEY = 'workflows_ui_previous_fields'
+
+
+def _cold_indices():
+    """Get the cold indices of the data types."""
+    return set(
+        config['cold_search_index'] for config in
+        current_app.config['WORKFLOWS_UI_DATA_TYPES'].values()
+        if config.get('cold_search_index')
+    )
+
 
 class WorkflowIndexer(RecordIndexer):
-    """Special indexer for workflow objects."""
+    """Special indexer for workflow objects.
+
+    :param record_to_indices: Function returning all the index/doc_type a
+        record may be indexed into, from which it is removed when deleted.
+
+    When the status or data type of a record move it to another index (e.g.
+    from the hot to the cold index), it is removed from the previous one.
+    """
+
+    def __init__(self, record_to_indices=None, **kwargs):
+        """Initialize indexer."""
+        super(WorkflowIndexer, self).__init__(**kwargs)
+        self.record_to_indices = record_to_indices or (
+            lambda record: [self.record_to_index(record)]
+        )
 
     @staticmethod
     def _prepare_record(record, index, doc_type=None):
-        """Prepare the workflow object record for ES."""
+        """Prepare the workflow object record for ES.
+
+        The fields of ``WORKFLOWS_UI_COLD_SOURCE_EXCLUDES`` are left out of
+        the records of cold indices.
+        """
         data = record.dumps()
+        if index in _cold_indices():
+            for field in current_app.config[
+                    'WORKFLOWS_UI_COLD_SOURCE_EXCLUDES']:
+                pop_field(data, field)
         if record.model.created.tzinfo:
             data['_created'] = record.model.created.isoformat()
         else:
@@ -60,18 +100,100 @@ class WorkflowIndexer(RecordIndexer):
         index, doc_type = self.record_to_index(record)
         if not index:
             return
+        if ES_VERSION[0] < 7 and not doc_type:
+            return
+        body = self._prepare_record(record, index, doc_type)
+        result = self._index(record, index, doc_type, body)
+        list_index, list_doc_type = self.record_to_list_index(record)
+        if list_index:
+            self._index(
+                record, list_index, list_doc_type,
+                self._prepare_list_record(body),
+            )
+        previous_index, previous_doc_type = self.record_to_previous_index(
+            record)
+        if previous_index and previous_index != index:
+            self._delete(record, previous_index, previous_doc_type,
+                         ignore=404)
+        current_workflows_ui.invalidate_search_cache()
+        return result
+
+    def record_to_previous_index(self, record):
+        """Get the index/doc_type of a record before its last changes.
+
+        :returns: The index/doc_type, or ``(None, None)`` if the fields
+            deciding it did not change since the record was last indexed.
+        """
+        previous = db.session.info.get(PREVIOUS_FIELDS_KEY, {}).pop(
+            record.id, None)
+        if not previous:
+            return None, None
+        return self.record_to_index(dict(
+            record, _workflow=dict(record['_workflow'], **previous)))
+
+    @staticmethod
+    def record_to_list_index(record):
+        """Get the index/doc_type of the lean list view record, if any."""
+        config = current_app.config['WORKFLOWS_UI_DATA_TYPES'].get(
+            record["_workflow"]["data_type"], {}
+        )
+        return (
+            config.get('list_search_index'),
+            config.get('list_search_type', config.get('search_type')),
+        )
+
+    @staticmethod
+    def _prepare_list_record(data):
+        """Keep only the ``WORKFLOWS_UI_LIST_INDEX_FIELDS`` of a record."""
+        return get_fields(
+            data, current_app.config['WORKFLOWS_UI_LIST_INDEX_FIELDS'])
+
+    def _index(self, record, index, doc_type, body):
+        """Index a record body into the given index."""
         if ES_VERSION[0] >= 7:
             return self.client.index(
                 id=str(record.id),
                 index=index,
-                body=self._prepare_record(record, index),
+                body=body,
             )
-        else:
-            if not doc_type:
-                return
-            return self.client.index(
+        return self.client.index(
+            id=str(record.id),
+            index=index,
+            doc_type=doc_type,
+            body=body,
+        )
+
+    def _delete_from_other_indices(self, record, index):
+        """Delete a record from the indices other than the given one."""
+        for other_index, other_doc_type in self.record_to_indices(record):
+            if other_index and other_index != index:
+                self._delete(record, other_index, other_doc_type, ignore=404)
+
+    def _delete(self, record, index, doc_type, **kwargs):
+        """Delete a record from the given index."""
+        if ES_VERSION[0] >= 7:
+            return self.client.delete(
                 id=str(record.id),
                 index=index,
-                doc_type=doc_type,
-                body=self._prepare_record(record, index, doc_type),
+                **kwargs
             )
+        return self.client.delete(
+            id=str(record.id),
+            index=index,
+            doc_type=doc_type,
+            **kwargs
+        )
+
+    def delete(self, record, **kwargs):
+        """Delete a record.
+
+        :param record: Record instance.
+        """
+        index, doc_type = self.record_to_index(record)
+        self._delete_from_other_indices(record, index)
+        list_index, list_doc_type = self.record_to_list_index(record)
+        if list_index:
+            self._delete(record, list_index, list_doc_type, ignore=404)
+        result = super(WorkflowIndexer, self).delete(record, **kwargs)
+        current_workflows_ui.invalidate_search_cache()
+        return result
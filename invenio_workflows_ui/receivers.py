@@ -22,15 +22,42 @@
 from __future__ import absolute_import, print_function
 
 from elasticsearch.exceptions import NotFoundError
+from invenio_db import db
 from invenio_workflows.models import WorkflowObjectModel
 from invenio_workflows.signals import workflow_object_after_save
+from sqlalchemy import inspect
 from sqlalchemy.event import listen
+from sqlalchemy.orm import object_session
 
-from .proxies import workflow_api_class
+from .indexer import PREVIOUS_FIELDS_KEY
+from .proxies import current_workflows_ui, workflow_api_class
+
+# Key of the session info holding the ids of the changed workflow objects,
+# whose cached modification date is invalidated once the changes commit.
+CHANGED_OBJECTS_KEY = 'workflows_ui_changed_objects'
+
+
+def invalidate_after_commit(session, object_id):
+    """Invalidate the cache of a workflow object once the session commits.
+
+    Invalidating it before would let a concurrent request cache the state
+    the object had before the commit.
+    """
+    session.info.setdefault(CHANGED_OBJECTS_KEY, set()).add(object_id)
+
+
+def invalidate_changed_objects(session):
+    """Invalidate the cache of the workflow objects changed by a commit."""
+    if session.transaction is not None and session.transaction.nested:
+        # Releasing a savepoint does not make the changes visible yet.
+        return
+    for object_id in session.info.pop(CHANGED_OBJECTS_KEY, ()):
+        current_workflows_ui.invalidate_object(object_id)
 
 
 def delete_from_index(mapper, connection, target):
     """Delete workflow object from index."""
+    invalidate_after_commit(object_session(target), target.id)
     obj = workflow_api_class.get_record(target.id)
     try:
         workflow_api_class.indexer.delete(obj)
@@ -41,6 +68,39 @@ def delete_from_index(mapper, connection, target):
 @workflow_object_after_save.connect
 def index_workflow_object(sender, **kwargs):
     """Index a workflow object for workflows UI."""
+    invalidate_after_commit(db.session, sender.id)
     workflow_api_class.create(sender)
 
+
+def invalidate_updated_object(mapper, connection, target):
+    """Invalidate the cache of a workflow object updated in any way.
+
+    Covers the updates not going through ``WorkflowObject.save()``.
+    """
+    invalidate_after_commit(object_session(target), target.id)
+
+
+def remember_index_fields(mapper, connection, target):
+    """Remember the fields deciding the index of a changed workflow object.
+
+    The indexer removes the object from its previous index when the status
+    or the data type move it to another one.
+    """
+    state = inspect(target)
+    changes = {}
+    for field in ('status', 'data_type'):
+        history = state.attrs[field].history
+        if history.deleted:
+            changes[field] = getattr(
+                history.deleted[0], 'name', history.deleted[0])
+    if changes:
+        previous = object_session(target).info.setdefault(
+            PREVIOUS_FIELDS_KEY, {}).setdefault(target.id, {})
+        for field, value in changes.items():
+            previous.setdefault(field, value)
+
+
 listen(WorkflowObjectModel, "before_delete", delete_from_index)
+listen(WorkflowObjectModel, "before_update", remember_index_fields)
+listen(WorkflowObjectModel, "after_update", invalidate_updated_object)
+listen(db.session, "after_commit", invalidate_changed_objects)
@@ -22,13 +22,34 @@
 from __future__ import absolute_import, print_function
 
 import copy
+import json
+import re
 
-from elasticsearch_dsl import Q
+from elasticsearch_dsl import A, Q
 
 from flask import current_app, request
 
+from six import string_types
 from werkzeug.datastructures import MultiDict
 
+from .errors import QueryTooComplexRESTError
+from .utils import split_values
+
+# Start of a raw search response, restricted by _RAW_FILTER_PATH.
+_RAW_PREFIX = re.compile(
+    r'\{(?:"timed_out":(true|false),)?(?:"terminated_early":(true|false),)?'
+    r'(?:"hits":\{"total":(?:(\d+)|\{"value":(\d+),"relation":"(\w+)"\}))?'
+)
+_RAW_FILTER_PATH = ','.join([
+    'hits.total',
+    'hits.hits',
+    'aggregations',
+    'timed_out',
+    'terminated_early',
+])
+_QUERY_OPERATORS = frozenset(['AND', 'OR', 'NOT', '&&', '||', '!'])
+_QUERY_DELIMITERS = {'"': '"', '/': '/', '[': ']}', '{': ']}'}
+
 
 def terms_filter(field):
     """Create a term filter."""
@@ -37,11 +58,25 @@ def terms_filter(field):
     return inner
 
 
-def _create_filter_dsl(urlkwargs, definitions):
+def range_filter(field, op):
+    """Create a range filter.
+
+    The first value is used as bound, it can be a date math expression
+    for dates (e.g. ``now-1d``).
+
+    :param field: Field to filter on.
+    :param op: Range operator, ``gt``, ``gte``, ``lt`` or ``lte``.
+    """
+    def inner(values):
+        return Q('range', **{field: {op: values[0]}})
+    return inner
+
+
+def _create_filter_dsl(urlkwargs, definitions, args):
     """Create a filter DSL expression."""
     filters = []
-    for name, filter_factory in definitions.items():
-        values = request.values.getlist(name, type=str)
+    for name, filter_factory in definitions:
+        values = args.getlist(name, type=str)
         if values:
             filters.append(filter_factory(values))
             for v in values:
@@ -50,9 +85,9 @@ def _create_filter_dsl(urlkwargs, definitions):
     return (filters, urlkwargs)
 
 
-def _post_filter(search, urlkwargs, definitions):
+def _post_filter(search, urlkwargs, definitions, args):
     """Ingest post filter in query."""
-    filters, urlkwargs = _create_filter_dsl(urlkwargs, definitions)
+    filters, urlkwargs = _create_filter_dsl(urlkwargs, definitions, args)
 
     for filter_ in filters:
         search = search.post_filter(filter_)
@@ -60,9 +95,9 @@ def _post_filter(search, urlkwargs, definitions):
     return (search, urlkwargs)
 
 
-def _query_filter(search, urlkwargs, definitions):
+def _query_filter(search, urlkwargs, definitions, args):
     """Ingest query filter in query."""
-    filters, urlkwargs = _create_filter_dsl(urlkwargs, definitions)
+    filters, urlkwargs = _create_filter_dsl(urlkwargs, definitions, args)
 
     for filter_ in filters:
         search = search.filter(filter_)
@@ -73,11 +108,207 @@ def _query_filter(search, urlkwargs, definitions):
 def _aggregations(search, definitions):
     """Add aggregations to query."""
     if definitions:
-        for name, agg in definitions.items():
-            search.aggs[name] = agg
+        for name, definition in definitions.items():
+            search.aggs[name] = A(definition)
     return search
 
 
+def _select_aggregations(definitions, names):
+    """Select the aggregations to add to query.
+
+    :param definitions: Available aggregations.
+    :param names: List of aggregation names, ``'all'`` or ``'none'``.
+    :returns: The selected aggregations.
+    """
+    if isinstance(names, string_types):
+        names = [names]
+    if 'all' in names:
+        return definitions
+    return {
+        name: agg for name, agg in definitions.items() if name in names
+    }
+
+
+def get_total_hits(search_result):
+    """Get the total number of hits of a search result.
+
+    :param search_result: Elasticsearch search result as a dictionary.
+    :returns: Tuple of (total, relation), where relation is ``'eq'`` if the
+        total is exact and ``'gte'`` if it is a lower bound.
+    """
+    total = search_result['hits']['total']
+    if isinstance(total, dict):
+        total, relation = int(total['value']), total.get('relation', 'eq')
+    else:
+        total, relation = int(total), 'eq'
+    if search_result.get('timed_out') or \
+            search_result.get('terminated_early'):
+        relation = 'gte'
+    return (total, relation)
+
+
+def execute_raw(search):
+    """Execute a search and get the raw text of the response.
+
+    The response is not decoded, and is restricted to the hits, their
+    total, the aggregations and the flags of partial results.
+
+    :param search: Search query.
+    :returns: The JSON text of the response.
+    """
+    params = {
+        key: ('true' if value else 'false')
+        if isinstance(value, bool) else value
+        for key, value in search._params.items()
+    }
+    params['filter_path'] = _RAW_FILTER_PATH
+    url = '/{0}/_search'.format(','.join(search._index or ['_all']))
+    connection = search._get_connection().transport.get_connection()
+    _, _, data = connection.perform_request(
+        'POST', url, params, body=json.dumps(search.to_dict()))
+    return data
+
+
+def get_raw_total_hits(raw):
+    """Get the total number of hits of a raw search response.
+
+    :param raw: JSON text of a search response, as returned by
+        :func:`execute_raw`.
+    :returns: Tuple of (total, relation) like :func:`get_total_hits`, total
+        being ``None`` when the hits are not counted.
+    """
+    timed_out, terminated_early, total, value, relation = \
+        _RAW_PREFIX.match(raw).groups()
+    if total is not None:
+        total, relation = int(total), 'eq'
+    elif value is not None:
+        total = int(value)
+    else:
+        relation = 'gte'
+    if timed_out == 'true' or terminated_early == 'true':
+        relation = 'gte'
+    return (total, relation)
+
+
+def _closing(query_string, start, delimiters):
+    """Find the first unescaped delimiter after a position.
+
+    :returns: The position of the delimiter, or ``None``.
+    """
+    i = start + 1
+    while i < len(query_string):
+        if query_string[i] == '\\':
+            i += 2
+            continue
+        if query_string[i] in delimiters:
+            return i
+        i += 1
+    return None
+
+
+def _query_clauses(query_string):
+    """Split a query string into its clauses.
+
+    Boolean operators and grouping are left out. Phrases, regular
+    expressions and ranges are single clauses, whatever they contain.
+
+    :param query_string: Query string of the search.
+    :returns: List of ``(kind, marks)``, where ``kind`` is ``term``,
+        ``phrase``, ``regexp`` or ``range`` and ``marks`` the positions of
+        the unescaped wildcards of a term or the delimiters of a regular
+        expression.
+    """
+    clauses = []
+    i = 0
+    while i < len(query_string):
+        if query_string[i].isspace() or query_string[i] in '()':
+            i += 1
+            continue
+        start = value_start = i
+        kind = 'term'
+        marks = []
+        while i < len(query_string) and not (
+                query_string[i].isspace() or query_string[i] in '()'):
+            char = query_string[i]
+            if char == '\\':
+                i += 2
+                continue
+            if i == value_start and char in '+-':
+                value_start = i + 1
+            elif i == value_start and char in _QUERY_DELIMITERS:
+                end = _closing(query_string, i, _QUERY_DELIMITERS[char])
+                if char == '"':
+                    kind = 'phrase'
+                    i = len(query_string) if end is None else end
+                elif end is not None:
+                    kind = 'regexp' if char == '/' else 'range'
+                    marks = [i, end] if char == '/' else []
+                    i = end
+            elif char == ':' and kind == 'term':
+                value_start = i + 1
+            elif char in '*?' and kind == 'term':
+                marks.append(i)
+            i += 1
+        token = query_string[start:i]
+        if value_start < i and token not in _QUERY_OPERATORS:
+            clauses.append((kind, marks))
+    return clauses
+
+
+def _escape(query_string, positions):
+    """Escape the characters of a query string at the given positions."""
+    for position in sorted(positions, reverse=True):
+        query_string = '{0}\\{1}'.format(
+            query_string[:position], query_string[position:])
+    return query_string
+
+
+def guard_query_string(query_string, guards=None):
+    """Check a query string against the query cost guards.
+
+    Queries with too many clauses are rejected, while regular expressions
+    and wildcards are kept, escaped or rejected depending on the guards.
+    Phrases are left untouched.
+
+    :param query_string: Query string of the search.
+    :param guards: Guards, defaults to ``WORKFLOWS_UI_REST_QUERY_GUARDS``.
+    :returns: The query string to run.
+    """
+    if guards is None:
+        guards = current_app.config['WORKFLOWS_UI_REST_QUERY_GUARDS']
+
+    clauses = _query_clauses(query_string)
+    escapes = []
+
+    max_clauses = guards.get('max_clauses')
+    if max_clauses and len(clauses) > max_clauses:
+        raise QueryTooComplexRESTError(
+            description='Too many clauses, at most {0} are allowed.'.format(
+                max_clauses))
+
+    regexps = [marks for kind, marks in clauses if kind == 'regexp']
+    if regexps:
+        action = guards.get('regexps', 'allow')
+        if action == 'reject':
+            raise QueryTooComplexRESTError(
+                description='Regular expressions are not allowed.')
+        elif action == 'escape':
+            escapes.extend(mark for marks in regexps for mark in marks)
+
+    wildcards = [marks for kind, marks in clauses if kind == 'term' and marks]
+    max_wildcards = guards.get('max_wildcards')
+    if max_wildcards is not None and len(wildcards) > max_wildcards:
+        action = guards.get('wildcards', 'reject')
+        if action == 'reject':
+            raise QueryTooComplexRESTError(
+                description='Too many wildcards, at most {0} are '
+                            'allowed.'.format(max_wildcards))
+        elif action == 'escape':
+            escapes.extend(mark for marks in wildcards for mark in marks)
+
+    return _escape(query_string, escapes)
+
+
 def parse_sort_field(field_value):
     """Parse a URL field.
 
@@ -126,80 +357,263 @@ def eval_field(field, asc):
         return {key: {'order': 'asc' if key_asc else 'desc'}}
 
 
-def default_facets_factory(search, index):
-    """Add facets to query."""
-    urlkwargs = MultiDict()
+def default_facets_factory(search, index, aggs=None, args=None):
+    """Add facets to query.
 
-    facets = current_app.config['WORKFLOWS_UI_REST_FACETS'].get(index)
+    :param search: Search query.
+    :param index: Index to search in, or its :class:`SearchTemplate`.
+    :param aggs: Aggregations to compute: a list of names, ``'all'`` or
+        ``'none'``. Defaults to the ``aggs`` request argument, or to the
+        ``WORKFLOWS_UI_REST_DEFAULT_AGGS`` of the index.
+    :param args: Arguments of the search, defaults to the request ones.
+    :returns: Tuple of (query, URL arguments).
+    """
+    urlkwargs = MultiDict()
+    args = request.values if args is None else args
+    template = SearchTemplate.get(index)
 
-    if facets is not None:
+    if template.has_facets:
         # Aggregations.
-        search = _aggregations(search, facets.get("aggs", {}))
+        if aggs is None:
+            aggs = split_values(args, 'aggs')
+            if aggs:
+                urlkwargs.add('aggs', ','.join(aggs))
+            else:
+                aggs = template.default_aggs
+        search = _aggregations(
+            search, _select_aggregations(template.aggs, aggs))
 
         # Query filter
         search, urlkwargs = _query_filter(
-            search, urlkwargs, facets.get("filters", {}))
+            search, urlkwargs, template.filters, args)
 
         # Post filter
         search, urlkwargs = _post_filter(
-            search, urlkwargs, facets.get("post_filters", {}))
+            search, urlkwargs, template.post_filters, args)
 
     return (search, urlkwargs)
 
 
+def default_source_filter_factory(search, args=None):
+    """Restrict the returned ``_source`` to the requested fields.
+
+    The fields to include are taken from the ``fields`` request argument
+    and the fields to exclude from ``exclude``. Both accept comma separated
+    values (e.g. ``fields=_workflow,_created,_updated``) and wildcards.
+
+    :param search: Search query.
+    :param args: Arguments of the search, defaults to the request ones.
+    :returns: Tuple of (query, URL arguments).
+    """
+    urlkwargs = MultiDict()
+    args = request.values if args is None else args
+    source = {}
+
+    for arg_name, source_key in (('fields', 'includes'),
+                                 ('exclude', 'excludes')):
+        values = split_values(args, arg_name)
+        if values:
+            source[source_key] = values
+            urlkwargs.add(arg_name, ','.join(values))
+
+    if source:
+        search = search.source(**source)
+
+    return (search, urlkwargs)
+
+
+def default_indices_factory(search, index, args=None):
+    """Restrict a query to the indices of the requested data types.
+
+    When the query is filtered on data types which all have their own
+    index (or alias) in ``WORKFLOWS_UI_DATA_TYPES``, only those indices are
+    searched instead of the index of the endpoint.
+
+    :param search: Search query.
+    :param index: Index to search in, or its :class:`SearchTemplate`.
+    :param args: Arguments of the search, defaults to the request ones.
+    :returns: The query.
+    """
+    args = request.values if args is None else args
+    template = SearchTemplate.get(index)
+
+    data_types = args.getlist('data_type', type=str)
+    if not data_types or not template.data_type_indices:
+        return search
+
+    indices = set()
+    for data_type in data_types:
+        if data_type not in template.data_type_indices:
+            return search
+        indices.update(template.data_type_indices[data_type])
+    return search.index().index(*sorted(indices))
+
+
 def default_search_factory(self, search, **kwargs):
-    """Create default ES query based on query-string pattern."""
+    """Create default ES query based on query-string pattern.
+
+    The query, filters, sorting and fields are read from the request
+    arguments, unless other arguments are passed as ``args``. The options
+    of the index are taken from the ``template`` passed, or else from the
+    ``search_template`` of the resource when it has one.
+    """
+    args = kwargs.get('args')
+    args = request.values if args is None else args
+    template = SearchTemplate.get(
+        kwargs.get('template') or getattr(self, 'search_template', None) or
+        search._index[0])
+
     if 'q' in kwargs:
         query_string = kwargs['q']
     else:
-        query_string = request.values.get('q', '')
+        query_string = args.get('q', '')
 
     if not query_string:
         # Assume empty query == match all
         search = search.query(Q('match_all'))
     else:
         search = search.query(Q('query_string',
-                                query=query_string,
+                                query=guard_query_string(
+                                    query_string, template.query_guards),
                                 allow_leading_wildcard=False))
 
-    search_index = search._index[0]
-
-    search, urlkwargs = default_facets_factory(search, search_index)
-    search, sortkwargs = default_sorter_factory(search, search_index)
+    search, urlkwargs = default_facets_factory(
+        search, template, aggs=kwargs.get('aggs'), args=args)
+    search = default_indices_factory(search, template, args=args)
+    search, sortkwargs = default_sorter_factory(
+        search, template, args=args)
     for key, value in sortkwargs.items():
         urlkwargs.add(key, value)
 
+    search, sourcekwargs = default_source_filter_factory(search, args=args)
+    for key, value in sourcekwargs.items(multi=True):
+        urlkwargs.add(key, value)
+
     urlkwargs.add('q', query_string)
     return (search, urlkwargs)
 
 
-def default_sorter_factory(search, index):
+def default_sorter_factory(search, index, args=None):
     """Sort a query.
 
     :param query: Search query.
-    :param index: Index to search in.
+    :param index: Index to search in, or its :class:`SearchTemplate`.
+    :param args: Arguments of the search, defaults to the request ones.
     :returns: Tuple of (query, URL arguments).
     """
+    args = request.values if args is None else args
+    template = SearchTemplate.get(index)
     sort_arg_name = 'sort'
-    urlfield = request.values.get(sort_arg_name, '', type=str)
+    urlfield = args.get(sort_arg_name, '', type=str)
 
     # Get default sorting if sort is not specified.
     if not urlfield:
-        has_query = request.values.get('q', type=str)
-        urlfield = current_app.config['WORKFLOWS_UI_REST_DEFAULT_SORT'].get(
-            index, {}).get('query' if has_query else 'noquery', '')
+        has_query = args.get('q', type=str)
+        urlfield = template.default_sort.get(
+            'query' if has_query else 'noquery', '')
 
     # Parse sort argument
     key, asc = parse_sort_field(urlfield)
 
-    # Get sort options
-    sort_options = current_app.config['WORKFLOWS_UI_REST_SORT_OPTIONS'].get(
-        index, {}).get(key)
-    if sort_options is None:
+    # Get fields to sort query by
+    sort_fields = template.sort_fields.get(key)
+    if sort_fields is None:
         return (search, {})
 
-    # Get fields to sort query by
-    search = search.sort(
-        *[eval_field(f, asc) for f in sort_options['fields']]
-    )
+    search = search.sort(*(
+        field(asc) if callable(field) else field
+        for field in sort_fields[asc]
+    ))
     return (search, {sort_arg_name: urlfield})
+
+
+class SearchTemplate(object):
+    """Search options of an index, compiled once and shared by requests.
+
+    Holds the facets, sort options, default sort and query guards of the
+    index, with the aggregations and sort fields already built. Searches
+    modify their aggregations in place, so they are kept as dictionaries
+    from which each search builds its own. Callable sort fields are only
+    evaluated when sorting, as they may depend on the request.
+
+    :param index: Index to search in.
+    :param config: Application configuration.
+    :param list_index: Whether the lean list indices of the data types are
+        searched instead of the full ones.
+    """
+
+    def __init__(self, index, config, list_index=False):
+        """Compile the search options of an index."""
+        facets = config['WORKFLOWS_UI_REST_FACETS'].get(index)
+        self.index = index
+        self.has_facets = facets is not None
+        facets = facets or {}
+        self.filters = tuple(facets.get('filters', {}).items())
+        self.post_filters = tuple(facets.get('post_filters', {}).items())
+        self.aggs = {
+            name: A(definition).to_dict()
+            for name, definition in facets.get('aggs', {}).items()
+        }
+        self.default_aggs = config['WORKFLOWS_UI_REST_DEFAULT_AGGS'].get(
+            index, 'all')
+
+        # Nest the summary aggregations, the first one being the outermost.
+        summary = config['WORKFLOWS_UI_REST_SUMMARY_AGGS'].get(index, [])
+        self.summary_names = tuple(name for name, _ in summary)
+        self.summary_agg = None
+        for name, definition in reversed(summary):
+            agg = A(definition)
+            if self.summary_agg:
+                agg.bucket(self.summary_agg[0], A(self.summary_agg[1]))
+            self.summary_agg = (name, agg.to_dict())
+
+        self.default_sort = dict(
+            config['WORKFLOWS_UI_REST_DEFAULT_SORT'].get(index, {}))
+        self.sort_fields = {
+            key: {
+                asc: tuple(
+                    f if callable(f) else eval_field(f, asc)
+                    for f in options['fields']
+                )
+                for asc in (True, False)
+            }
+            for key, options in config['WORKFLOWS_UI_REST_SORT_OPTIONS'].get(
+                index, {}).items()
+        }
+        self.query_guards = dict(config['WORKFLOWS_UI_REST_QUERY_GUARDS'])
+
+        # Indices holding each data type, when filtering on data types.
+        self.data_type_indices = {}
+        if 'data_type' in dict(self.filters):
+            self.data_type_indices = {
+                data_type: self._data_type_indices(options, list_index)
+                for data_type, options in config[
+                    'WORKFLOWS_UI_DATA_TYPES'].items()
+            }
+
+    @staticmethod
+    def _data_type_indices(options, list_index=False):
+        """Get the indices holding the records of a data type.
+
+        Without an alias, the cold index of the data type is searched along
+        with its hot one.
+        """
+        if list_index and options.get('list_search_index'):
+            return (options['list_search_index'],)
+        if options.get('search_alias'):
+            return (options['search_alias'],)
+        return tuple(
+            options[key] for key in ('search_index', 'cold_search_index')
+            if options.get(key)
+        )
+
+    @classmethod
+    def get(cls, index):
+        """Get the template of an index.
+
+        :param index: Index name, compiled from the application
+            configuration, or an already compiled template.
+        """
+        if isinstance(index, cls):
+            return index
+        return cls(index, current_app.config)
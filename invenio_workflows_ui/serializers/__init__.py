@@ -30,14 +30,50 @@ import json
 
 from .response import (
     workflow_responsify,
+    search_raw_responsify,
     search_responsify,
+    search_stream_responsify,
     action_responsify,
-    file_responsify
+    file_responsify,
+    multi_search_responsify,
+    stream_responsify,
+    summary_responsify,
 )
-from .json import JSONSerializer
+from .binary import CBORSerializer, MessagePackSerializer
+from .csv import CSVSerializer
+from .json import JSONSerializer, NDJSONSerializer
 
 json_v1 = JSONSerializer()
 json_serializer = workflow_responsify(json_v1, 'application/json')
 json_search_serializer = search_responsify(json_v1, 'application/json')
+json_search_stream_serializer = search_stream_responsify(
+    json_v1, 'application/json')
+json_search_raw_serializer = search_raw_responsify(
+    json_v1, 'application/vnd.workflows-ui.raw+json')
 json_action_serializer = action_responsify(json_v1, 'application/json')
 json_file_serializer = file_responsify(json_v1, 'application/json')
+json_multi_search_serializer = multi_search_responsify(
+    json_v1, 'application/json')
+json_stream_serializer = stream_responsify(json_v1, 'application/json')
+json_summary_serializer = summary_responsify(json_v1, 'application/json')
+
+ndjson_v1 = NDJSONSerializer()
+ndjson_stream_serializer = stream_responsify(
+    ndjson_v1, 'application/x-ndjson')
+
+csv_v1 = CSVSerializer()
+csv_stream_serializer = stream_responsify(csv_v1, 'text/csv')
+
+msgpack_v1 = MessagePackSerializer()
+msgpack_serializer = workflow_responsify(msgpack_v1, 'application/msgpack')
+msgpack_search_serializer = search_responsify(
+    msgpack_v1, 'application/msgpack')
+msgpack_action_serializer = action_responsify(
+    msgpack_v1, 'application/msgpack')
+msgpack_file_serializer = file_responsify(msgpack_v1, 'application/msgpack')
+
+cbor_v1 = CBORSerializer()
+cbor_serializer = workflow_responsify(cbor_v1, 'application/cbor')
+cbor_search_serializer = search_responsify(cbor_v1, 'application/cbor')
+cbor_action_serializer = action_responsify(cbor_v1, 'application/cbor')
+cbor_file_serializer = file_responsify(cbor_v1, 'application/cbor')
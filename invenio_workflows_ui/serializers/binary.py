@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""MessagePack and CBOR serializers for workflow objects."""
+
+from __future__ import absolute_import, print_function
+
+from ..errors import SerializerNotAvailableRESTError
+from .json import JSONSerializer, _default
+
+
+class MessagePackSerializer(JSONSerializer):
+    """MessagePack serializer for workflow objects.
+
+    Produces the same documents as :class:`JSONSerializer`. Requires the
+    ``msgpack`` package.
+    """
+
+    def _dumps(self, data):
+        """Encode the data of a response."""
+        try:
+            import msgpack
+        except ImportError:
+            raise SerializerNotAvailableRESTError()
+        return msgpack.packb(data, use_bin_type=True, default=_default)
+
+
+class CBORSerializer(JSONSerializer):
+    """CBOR serializer for workflow objects.
+
+    Produces the same documents as :class:`JSONSerializer`. Requires the
+    ``cbor2`` package.
+    """
+
+    def _dumps(self, data):
+        """Encode the data of a response."""
+        try:
+            import cbor2
+        except ImportError:
+            raise SerializerNotAvailableRESTError()
+        return cbor2.dumps(
+            data,
+            default=lambda encoder, value: encoder.encode(_default(value)),
+        )
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""CSV serializer for streams of records."""
+
+from __future__ import absolute_import, print_function
+
+import csv
+
+from flask import current_app, json
+from six import StringIO, string_types
+
+
+def _get_field(data, field):
+    """Get the value of a dotted field (e.g. ``_workflow.status``)."""
+    for key in field.split('.'):
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
+
+
+class CSVSerializer(object):
+    """CSV serializer for streams of records.
+
+    Nested values are written as JSON.
+    """
+
+    @staticmethod
+    def _format_value(value):
+        """Format a value for a CSV cell."""
+        if value is None:
+            return ''
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, separators=(',', ':'))
+        if isinstance(value, string_types):
+            return value
+        return json.dumps(value)
+
+    def serialize_stream(self, data, fields=None):
+        """Serialize an iterable of records, one CSV row per record.
+
+        :param data: Iterable of records as dictionaries.
+        :param fields: Dotted fields to use as columns, defaults to
+            ``WORKFLOWS_UI_REST_EXPORT_CSV_FIELDS``.
+        """
+        fields = fields or \
+            current_app.config['WORKFLOWS_UI_REST_EXPORT_CSV_FIELDS']
+        buf = StringIO()
+        writer = csv.writer(buf)
+
+        def flush():
+            value = buf.getvalue()
+            buf.seek(0)
+            buf.truncate(0)
+            return value
+
+        writer.writerow(fields)
+        yield flush()
+        for item in data:
+            writer.writerow([
+                self._format_value(_get_field(item, field))
+                for field in fields
+            ])
+            yield flush()
@@ -26,9 +26,91 @@
 
 from __future__ import absolute_import, print_function
 
-from elasticsearch import VERSION as ES_VERSION
 from flask import current_app, json, request
 
+from ..search import get_total_hits
+from ..utils import obj_or_import_string
+
+_json_backends = {}
+
+
+def _default(obj):
+    """Encode the objects unknown to a JSON backend like Flask does."""
+    return current_app.json_encoder().default(obj)
+
+
+def _orjson_backend():
+    """Get the dumps function of orjson, returning bytes."""
+    import orjson
+
+    def dumps(data, indent=None, separators=None):
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=_default, option=option)
+    return dumps
+
+
+def _ujson_backend():
+    """Get the dumps function of ujson."""
+    import ujson
+
+    def dumps(data, indent=None, separators=None):
+        return ujson.dumps(data, indent=indent or 0, ensure_ascii=False,
+                           escape_forward_slashes=False, default=_default)
+    return dumps
+
+
+def _rapidjson_backend():
+    """Get the dumps function of python-rapidjson."""
+    import rapidjson
+
+    def dumps(data, indent=None, separators=None):
+        return rapidjson.dumps(data, indent=indent, ensure_ascii=False,
+                               datetime_mode=rapidjson.DM_ISO8601,
+                               uuid_mode=rapidjson.UM_CANONICAL,
+                               default=_default)
+    return dumps
+
+
+# Factories of the dumps functions of the JSON backends.
+JSON_BACKENDS = {
+    'flask': lambda: json.dumps,
+    'orjson': _orjson_backend,
+    'ujson': _ujson_backend,
+    'rapidjson': _rapidjson_backend,
+}
+
+
+def get_json_backend(name):
+    """Get the dumps function of a JSON backend.
+
+    Falls back to Flask's encoder when the backend is not installed.
+
+    :param name: Name of a backend of ``JSON_BACKENDS`` or import string of
+        a dumps function accepting ``indent`` and ``separators``.
+    """
+    if name not in _json_backends:
+        try:
+            if name in JSON_BACKENDS:
+                _json_backends[name] = JSON_BACKENDS[name]()
+            else:
+                _json_backends[name] = obj_or_import_string(name)
+        except ImportError:
+            current_app.logger.warning(
+                'JSON backend %s is not available, using Flask.', name)
+            _json_backends[name] = json.dumps
+    return _json_backends[name]
+
+
+def json_dumps(data, **kwargs):
+    """Encode data with the configured ``WORKFLOWS_UI_JSON_BACKEND``.
+
+    :returns: The JSON document, as bytes or text depending on the backend.
+    """
+    dumps = get_json_backend(current_app.config['WORKFLOWS_UI_JSON_BACKEND'])
+    return dumps(data, **kwargs)
+
 
 class JSONSerializer(object):
     """JSON serializer for workflow object.
@@ -52,19 +134,23 @@ class JSONSerializer(object):
                 separators=(',', ':'),
             )
 
+    def _dumps(self, data):
+        """Encode the data of a response."""
+        return json_dumps(data, **self._format_args())
+
     def serialize(self, workflow_ui_object):
         """Serialize a single workflow object.
 
         :param workflow_ui_object: workflow record instance.
         """
-        return json.dumps(workflow_ui_object.dumps(), **self._format_args())
+        return self._dumps(workflow_ui_object.dumps())
 
     def serialize_action(self, data):
         """Serialize an action response.
 
         :param workflow_ui_object: workflow record instance.
         """
-        return json.dumps(dict(data), **self._format_args())
+        return self._dumps(dict(data))
 
     def serialize_files(self, data):
         """Serialize files for a workflow object.
@@ -73,27 +159,118 @@ class JSONSerializer(object):
         """
         from invenio_workflows.models import WorkflowFilesIterator
         if isinstance(data, WorkflowFilesIterator):
-            return json.dumps([
+            return self._dumps([
                 file_obj.dumps() for file_obj in data
-            ], **self._format_args())
+            ])
         else:
-            return json.dumps(data.dumps(), **self._format_args())
+            return self._dumps(data.dumps())
 
-    def serialize_search(self, search_result, links=None):
-        """Serialize a search result.
-
-        :param search_result: Elasticsearch search result.
-        :param links: Dictionary of links to add to response.
-        """
+    @staticmethod
+    def _search_result(search_result, links=None):
+        """Build the serialized form of a search result."""
+        total, relation = get_total_hits(search_result)
         hits = dict(
             hits=search_result['hits']['hits'],
+            total=total,
+            total_relation=relation,
         )
-        if ES_VERSION[0] >= 7:
-            hits['total'] = search_result['hits']['total']['value']
-        else:
-            hits['total'] = search_result['hits']['total']
-        return json.dumps(dict(
+        result = dict(
             hits=hits,
             links=links or {},
             aggregations=search_result.get('aggregations', dict()),
-        ), **self._format_args())
+        )
+        # Flag partial results of searches stopped before the end.
+        for flag in ('timed_out', 'terminated_early'):
+            if search_result.get(flag):
+                result[flag] = True
+        return result
+
+    def serialize_search(self, search_result, links=None):
+        """Serialize a search result.
+
+        :param search_result: Elasticsearch search result.
+        :param links: Dictionary of links to add to response.
+        """
+        return self._dumps(
+            self._search_result(search_result, links=links))
+
+    def serialize_search_raw(self, raw, links=None):
+        """Serialize a raw search response, adding the links to it.
+
+        :param raw: JSON text of an Elasticsearch search response.
+        :param links: Dictionary of links to add to response.
+        """
+        links = json_dumps(links or {}, separators=(',', ':'))
+        if isinstance(links, bytes):
+            links = links.decode('utf-8')
+        raw = raw.rstrip()[:-1].rstrip()
+        return '{0}{1}"links":{2}}}'.format(
+            raw, '' if raw.endswith('{') else ',', links)
+
+    def serialize_search_stream(self, search_result, links=None):
+        """Serialize a search result incrementally, one hit at a time.
+
+        :param search_result: Elasticsearch search result.
+        :param links: Dictionary of links to add to response.
+        """
+        separators = (',', ':')
+        result = self._search_result(search_result, links=links)
+        hits = result.pop('hits')
+
+        yield '{"hits":{"hits":['
+        for index, hit in enumerate(hits.pop('hits')):
+            if index:
+                yield ','
+            yield json_dumps(hit, separators=separators)
+        # The remaining members of the objects are encoded without their
+        # opening brace, which closes the hits list and objects.
+        yield '],'
+        yield json_dumps(hits, separators=separators)[1:]
+        yield ','
+        yield json_dumps(result, separators=separators)[1:]
+
+    def serialize_multi_search(self, search_results, links=None):
+        """Serialize named search results.
+
+        :param search_results: Dictionary of Elasticsearch search results.
+        :param links: Dictionary of the links of each search result.
+        """
+        links = links or {}
+        return self._dumps({
+            name: self._search_result(search_result, links=links.get(name))
+            for name, search_result in search_results.items()
+        })
+
+    def serialize_summary(self, summary):
+        """Serialize the counts of the dashboard summary.
+
+        :param summary: Total and nested counts of the records.
+        """
+        return self._dumps(summary)
+
+    def serialize_stream(self, data, fields=None):
+        """Serialize an iterable of records as a JSON array, incrementally.
+
+        :param data: Iterable of records as dictionaries.
+        :param fields: Unused, the records are expected to be filtered.
+        """
+        separator = '['
+        for item in data:
+            yield separator
+            yield json_dumps(item, separators=(',', ':'))
+            separator = ','
+        yield '[]' if separator == '[' else ']'
+
+
+class NDJSONSerializer(object):
+    """Newline delimited JSON serializer for streams of records."""
+
+    def serialize_stream(self, data, fields=None):
+        """Serialize an iterable of records, one JSON document per line.
+
+        :param data: Iterable of records as dictionaries.
+        :param fields: Unused, the records are expected to be filtered.
+        """
+        for item in data:
+            line = json_dumps(item, separators=(',', ':'))
+            yield line + (b'\n' if isinstance(line, bytes) else '\n')
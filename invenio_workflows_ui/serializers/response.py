@@ -29,12 +29,121 @@ Responsible for creating a HTTP response given the output of a serializer.
 
 from __future__ import absolute_import, print_function
 
-from flask import current_app
+import zlib
+
+from flask import (
+    current_app,
+    has_request_context,
+    request,
+    stream_with_context,
+)
 
 from hashlib import sha1
 from six import text_type
 
 
+def _gzip_compressor(level=None):
+    """Get the compress, flush and finish functions of a gzip stream."""
+    if level is None:
+        level = zlib.Z_DEFAULT_COMPRESSION
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return (
+        compressor.compress,
+        lambda: compressor.flush(zlib.Z_SYNC_FLUSH),
+        compressor.flush,
+    )
+
+
+def _brotli_compressor(level=None):
+    """Get the compress, flush and finish functions of a brotli stream."""
+    import brotli
+    if level is None:
+        # The default quality of brotli is too slow for dynamic responses.
+        level = 4
+    compressor = brotli.Compressor(quality=level)
+    return compressor.process, compressor.flush, compressor.finish
+
+
+COMPRESSORS = {
+    'gzip': _gzip_compressor,
+    'br': _brotli_compressor,
+}
+
+
+def _compressor(encoding):
+    """Get the compress and finish functions of an encoding if available."""
+    level = current_app.config['WORKFLOWS_UI_REST_COMPRESSION_LEVELS'].get(
+        encoding)
+    try:
+        return COMPRESSORS[encoding](level)
+    except ImportError:
+        return None
+
+
+def _compress_stream(chunks, compress, flush, finish, charset, flush_size):
+    """Compress the chunks of a streamed body.
+
+    The compressed data is flushed every ``flush_size`` bytes of input, so
+    that the client gets the body while it is being produced.
+    """
+    pending = 0
+    for chunk in chunks:
+        if isinstance(chunk, text_type):
+            chunk = chunk.encode(charset)
+        data = compress(chunk)
+        pending += len(chunk)
+        if pending >= flush_size:
+            data += flush()
+            pending = 0
+        if data:
+            yield data
+    yield finish()
+
+
+def compress_response(response):
+    """Compress a response with the encoding preferred by the client.
+
+    The encodings of ``WORKFLOWS_UI_REST_COMPRESSION_ENCODINGS`` are tried
+    in order against the ``Accept-Encoding`` header. Bodies smaller than
+    ``WORKFLOWS_UI_REST_COMPRESSION_MIN_SIZE`` are sent as they are, while
+    streamed bodies are always compressed as they are produced.
+
+    :param response: Response to compress.
+    :returns: The response.
+    """
+    config = current_app.config
+    encodings = config['WORKFLOWS_UI_REST_COMPRESSION_ENCODINGS']
+    if not encodings or not has_request_context():
+        return response
+    response.vary.add('Accept-Encoding')
+    if not 200 <= response.status_code < 300 or \
+            response.status_code == 204 or \
+            'Content-Encoding' in response.headers:
+        return response
+    if not response.is_streamed and len(response.get_data()) < \
+            config['WORKFLOWS_UI_REST_COMPRESSION_MIN_SIZE']:
+        return response
+
+    for encoding in encodings:
+        if not request.accept_encodings.quality(encoding):
+            continue
+        compressor = _compressor(encoding)
+        if compressor is None:
+            continue
+        compress, flush, finish = compressor
+        if response.is_streamed:
+            response.response = _compress_stream(
+                response.response, compress, flush, finish,
+                response.charset,
+                config['WORKFLOWS_UI_REST_COMPRESSION_FLUSH_SIZE'])
+            response.headers.pop('Content-Length', None)
+        else:
+            response.set_data(compress(response.get_data()) + finish())
+        response.headers['Content-Encoding'] = encoding
+        break
+    return response
+
+
 def workflow_responsify(serializer, mimetype):
     """Create a Workflows-REST response serializer.
 
@@ -49,12 +158,14 @@ def workflow_responsify(serializer, mimetype):
         etag_value = text_type(workflow_object.model.modified)
         etag = sha1(etag_value.encode('utf-8')).hexdigest()
 
-        response.set_etag(etag)
+        # The ETag is weak as it is shared by the compressed bodies, which
+        # are only semantically equivalent to the uncompressed one.
+        response.set_etag(etag, weak=True)
         response.last_modified = workflow_object.model.modified
 
         if headers is not None:
             response.headers.extend(headers)
-        return response
+        return compress_response(response)
     return view
 
 
@@ -72,7 +183,7 @@ def action_responsify(serializer, mimetype):
 
         if headers is not None:
             response.headers.extend(headers)
-        return response
+        return compress_response(response)
     return view
 
 
@@ -90,7 +201,7 @@ def file_responsify(serializer, mimetype):
 
         if headers is not None:
             response.headers.extend(headers)
-        return response
+        return compress_response(response)
     return view
 
 
@@ -108,5 +219,105 @@ def search_responsify(serializer, mimetype):
         response.status_code = code
         if headers is not None:
             response.headers.extend(headers)
-        return response
+        return compress_response(response)
+    return view
+
+
+def search_raw_responsify(serializer, mimetype):
+    """Create a Workflows-REST raw search result response serializer.
+
+    The list endpoint passes the response of Elasticsearch to it as text,
+    without decoding it.
+
+    :param serializer: Serializer instance.
+    :param mimetype: MIME type of response.
+    """
+    def view(search_result, code=200, headers=None, links=None):
+        response = current_app.response_class(
+            serializer.serialize_search_raw(search_result,
+                                            links=links),
+            mimetype=mimetype)
+        response.status_code = code
+        if headers is not None:
+            response.headers.extend(headers)
+        return compress_response(response)
+    view.raw_search = True
+    return view
+
+
+def search_stream_responsify(serializer, mimetype):
+    """Create a Workflows-REST streamed search result response serializer.
+
+    The hits are encoded while the response is being sent to the client.
+
+    :param serializer: Serializer instance.
+    :param mimetype: MIME type of response.
+    """
+    def view(search_result, code=200, headers=None, links=None):
+        response = current_app.response_class(
+            stream_with_context(
+                serializer.serialize_search_stream(search_result,
+                                                   links=links)
+            ),
+            mimetype=mimetype)
+        response.status_code = code
+        if headers is not None:
+            response.headers.extend(headers)
+        return compress_response(response)
+    return view
+
+
+def multi_search_responsify(serializer, mimetype):
+    """Create a Workflows-REST multi search result response serializer.
+
+    :param serializer: Serializer instance.
+    :param mimetype: MIME type of response.
+    """
+    def view(search_results, code=200, headers=None, links=None):
+        response = current_app.response_class(
+            serializer.serialize_multi_search(search_results,
+                                              links=links),
+            mimetype=mimetype)
+        response.status_code = code
+        if headers is not None:
+            response.headers.extend(headers)
+        return compress_response(response)
+    return view
+
+
+def summary_responsify(serializer, mimetype):
+    """Create a Workflows-REST dashboard summary response serializer.
+
+    :param serializer: Serializer instance.
+    :param mimetype: MIME type of response.
+    """
+    def view(summary, code=200, headers=None):
+        response = current_app.response_class(
+            serializer.serialize_summary(summary),
+            mimetype=mimetype)
+        response.status_code = code
+        if headers is not None:
+            response.headers.extend(headers)
+        return compress_response(response)
+    return view
+
+
+def stream_responsify(serializer, mimetype):
+    """Create a Workflows-REST streamed response serializer.
+
+    The body is produced incrementally while being sent to the client.
+
+    :param serializer: Serializer instance.
+    :param mimetype: MIME type of response.
+    """
+    def view(data, code=200, headers=None, fields=None):
+        response = current_app.response_class(
+            stream_with_context(
+                serializer.serialize_stream(data, fields=fields)
+            ),
+            mimetype=mimetype)
+        response.status_code = code
+        if headers is not None:
+            response.headers.extend(headers)
+        return compress_response(response)
     return view
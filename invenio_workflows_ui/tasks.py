@@ -28,7 +28,7 @@ from invenio_search import current_search_client
 from invenio_workflows.api import WorkflowObject
 from invenio_workflows.errors import WorkflowsError
 
-from .proxies import workflow_api_class
+from .proxies import current_workflows_ui, workflow_api_class
 
 
 LOGGER = get_task_logger(__name__)
@@ -45,6 +45,11 @@ def resolve_actions(object_ids, action, *args, **kwargs):
             getattr(workflow_ui_object, action)(*args, **kwargs)
 
 
+def _is_missing_delete(failure):
+    """Whether a bulk failure is the deletion of a missing document."""
+    return failure.get('delete', {}).get('status') == 404
+
+
 @shared_task(ignore_result=False)
 def batch_reindex(workflow_ids, request_timeout):
     """Task for bulk reindexing workflow records."""
@@ -71,6 +76,23 @@ def batch_reindex(workflow_ids, request_timeout):
                     '_op_type': 'index',
                     '_source': body,
                 }
+                for other_index, _ in indexer.record_to_indices(
+                        workflow_api_object):
+                    if other_index and other_index != index:
+                        yield {
+                            '_id': workflow_api_object.id,
+                            '_index': other_index,
+                            '_op_type': 'delete',
+                        }
+                list_index, _ = indexer.record_to_list_index(
+                    workflow_api_object)
+                if list_index:
+                    yield {
+                        '_id': workflow_api_object.id,
+                        '_index': list_index,
+                        '_op_type': 'index',
+                        '_source': indexer._prepare_list_record(body),
+                    }
             except WorkflowsError as e:
                 LOGGER.warn('Workflow %s failed to load: %s', workflow_id, e)
 
@@ -83,8 +105,12 @@ def batch_reindex(workflow_ids, request_timeout):
         max_retries=5,
         initial_backoff=10,
     )
+    current_workflows_ui.invalidate_search_cache()
 
     return {
         'success': success,
-        'failures': [repr(failure) for failure in failures or []]
+        'failures': [
+            repr(failure) for failure in failures or []
+            if not _is_missing_delete(failure)
+        ]
     }
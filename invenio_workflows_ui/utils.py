@@ -33,3 +33,39 @@ def obj_or_import_string(value, default=None):
     elif value:
         return value
     return default
+
+
+def split_values(args, name):
+    """Get the comma separated values of a request argument."""
+    values = []
+    for value in args.getlist(name, type=str):
+        values.extend(v.strip() for v in value.split(',') if v.strip())
+    return values
+
+
+def get_fields(data, fields):
+    """Copy only the given dotted fields (e.g. ``_workflow.status``)."""
+    result = {}
+    for field in fields:
+        keys = field.split('.')
+        value = data
+        for key in keys:
+            if not isinstance(value, dict) or key not in value:
+                break
+            value = value[key]
+        else:
+            target = result
+            for key in keys[:-1]:
+                target = target.setdefault(key, {})
+            target[keys[-1]] = value
+    return result
+
+
+def pop_field(data, field):
+    """Remove a dotted field (e.g. ``metadata.references``) from data."""
+    keys = field.split('.')
+    for key in keys[:-1]:
+        data = data.get(key)
+        if not isinstance(data, dict):
+            return
+    data.pop(keys[-1], None)
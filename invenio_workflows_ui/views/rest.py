@@ -28,8 +28,10 @@ from __future__ import absolute_import, print_function
 
 import os
 import json
+import logging
 
 from elasticsearch import VERSION as ES_VERSION
+from elasticsearch_dsl import A, MultiSearch
 from hashlib import sha1
 from functools import partial, wraps
 
@@ -45,21 +47,48 @@ from flask import (
 from invenio_db import db
 from invenio_rest import ContentNegotiatedMethodView
 from invenio_rest.errors import RESTException
-from invenio_search import RecordsSearch
+from invenio_search import RecordsSearch, current_search_client
 from flask_login import current_user
 from six import text_type
+from werkzeug.datastructures import MultiDict
 
 from invenio_workflows.errors import WorkflowsMissingObject
-
-from ..search import default_search_factory
+from jsonpatch import JsonPatchException
+from jsonpointer import JsonPointerException
+
+from ..errors import (
+    InvalidBatchRESTError,
+    InvalidMultiSearchRESTError,
+    PatchJSONFailureRESTError,
+    SameWeakContentException,
+)
+from ..search import (
+    SearchTemplate,
+    default_search_factory,
+    execute_raw,
+    get_raw_total_hits,
+    get_total_hits,
+)
 from ..tasks import resolve_actions
-from ..utils import obj_or_import_string
-from ..proxies import workflow_api_class
+from ..utils import (
+    get_fields,
+    obj_or_import_string,
+    pop_field,
+    split_values,
+)
+from ..proxies import current_workflows_ui, workflow_api_class
 from ..permissions import action_read_permission, action_write_permission
 
 
-def create_blueprint(config, context_processors):
-    """Create Invenio-Deposit-REST blueprint with all views."""
+def create_blueprint(config, context_processors, app_config=None):
+    """Create Invenio-Deposit-REST blueprint with all views.
+
+    :param config: REST endpoint configuration.
+    :param context_processors: Template context processors.
+    :param app_config: Application configuration, used to compile the
+        search options of the endpoint once for all requests. Without it
+        they are read from the configuration on each request.
+    """
     blueprint = Blueprint(
         'invenio_workflows_rest',
         __name__,
@@ -70,14 +99,38 @@ def create_blueprint(config, context_processors):
     search_serializers = config.get('search_serializers')
     action_serializers = config.get('action_serializers')
     file_serializers = config.get('file_serializers')
+    export_serializers = config.get('export_serializers', {})
+    multi_search_serializers = config.get('multi_search_serializers', {})
+    summary_serializers = config.get('summary_serializers', {})
+    batch_serializers = config.get('batch_serializers', {})
     bulk_action_serializers = config.get('bulk_action_serializers')
     default_media_type = config.get('default_media_type')
     search_index = config.get('search_index')
     max_result_window = config.get('max_result_window')
+    search_cache_timeout = config.get('search_cache_timeout')
+    search_options = {}
+    if ES_VERSION[0] >= 7 and config.get('track_total_hits') is not None:
+        search_options['track_total_hits'] = config['track_total_hits']
+    if config.get('search_timeout'):
+        search_options['timeout'] = config['search_timeout']
+    if config.get('search_terminate_after'):
+        search_options['terminate_after'] = config['search_terminate_after']
 
     search_factory = config.get('search_factory_imp', default_search_factory)
     search_factory = obj_or_import_string(search_factory)
 
+    search_template = None
+    if app_config is not None:
+        search_template = SearchTemplate(search_index, app_config)
+
+    # Lists and facets without a query can be served by the lean list
+    # index; the search options stay the ones of the full index.
+    list_search_index = config.get('list_search_index')
+    list_search_template = None
+    if list_search_index and app_config is not None:
+        list_search_template = SearchTemplate(
+            search_index, app_config, list_index=True)
+
     workflow_object_serializers = {
         mime: obj_or_import_string(func)
         for mime, func in workflow_object_serializers.items()
@@ -98,25 +151,90 @@ def create_blueprint(config, context_processors):
         mime: obj_or_import_string(func)
         for mime, func in file_serializers.items()
     }
+    export_serializers = {
+        mime: obj_or_import_string(func)
+        for mime, func in export_serializers.items()
+    }
+    summary_serializers = {
+        mime: obj_or_import_string(func)
+        for mime, func in summary_serializers.items()
+    }
+    multi_search_serializers = {
+        mime: obj_or_import_string(func)
+        for mime, func in multi_search_serializers.items()
+    }
+    batch_serializers = {
+        mime: obj_or_import_string(func)
+        for mime, func in batch_serializers.items()
+    }
 
     list_view = WorkflowsListResource.as_view(
         WorkflowsListResource.view_name,
         search_serializers=search_serializers,
+        serializers_query_aliases=config.get('search_serializers_aliases'),
         workflow_object_serializers=workflow_object_serializers,
         default_media_type=default_media_type,
         search_index=search_index,
+        list_search_index=list_search_index,
         search_factory=search_factory,
-        max_result_window=max_result_window
+        max_result_window=max_result_window,
+        search_cache_timeout=search_cache_timeout,
+        search_options=search_options,
+        search_template=search_template,
+        list_search_template=list_search_template,
     )
     list_route = config.get('list_route')
 
+    multi_search_view = WorkflowsMultiSearchResource.as_view(
+        WorkflowsMultiSearchResource.view_name,
+        serializers=multi_search_serializers,
+        default_media_type=default_media_type,
+        search_index=search_index,
+        search_factory=search_factory,
+        max_result_window=max_result_window,
+        search_options=search_options,
+        search_template=search_template,
+        multi_search_max_size=config.get('multi_search_max_size'),
+    )
+    multi_search_route = config.get('multi_search_route')
+
+    export_view = WorkflowsExportResource.as_view(
+        WorkflowsExportResource.view_name,
+        serializers=export_serializers,
+        serializers_query_aliases=config.get('export_serializers_aliases'),
+        default_media_type=config.get('export_default_media_type'),
+        search_index=search_index,
+        search_factory=search_factory,
+        search_template=search_template,
+    )
+    export_route = config.get('export_route')
+
+    summary_view = WorkflowsSummaryResource.as_view(
+        WorkflowsSummaryResource.view_name,
+        serializers=summary_serializers,
+        default_media_type=default_media_type,
+        search_index=search_index,
+        summary_cache_timeout=config.get('summary_cache_timeout'),
+        search_template=search_template,
+    )
+    summary_route = config.get('summary_route')
+
     item_view = WorkflowObjectResource.as_view(
         WorkflowObjectResource.view_name,
         serializers=workflow_object_serializers,
         default_media_type=default_media_type,
+        item_cache_timeout=config.get('item_cache_timeout'),
     )
     item_route = config.get('item_route')
 
+    batch_view = WorkflowObjectsBatchResource.as_view(
+        WorkflowObjectsBatchResource.view_name,
+        serializers=batch_serializers,
+        default_media_type=default_media_type,
+        batch_max_size=config.get('batch_max_size'),
+    )
+    batch_route = config.get('batch_route')
+
     actions_segment = (
         "action/<any(resolve,restart,restart_step,resume,edit):action>"
     )
@@ -164,6 +282,16 @@ def create_blueprint(config, context_processors):
         dict(rule=file_item_route, view_func=file_item_view),
     ]
 
+    if export_route:
+        views.append(dict(rule=export_route, view_func=export_view))
+    if summary_route:
+        views.append(dict(rule=summary_route, view_func=summary_view))
+    if batch_route:
+        views.append(dict(rule=batch_route, view_func=batch_view))
+    if multi_search_route:
+        views.append(
+            dict(rule=multi_search_route, view_func=multi_search_view))
+
     for rule in views:
         blueprint.add_url_rule(**rule)
 
@@ -173,6 +301,171 @@ def create_blueprint(config, context_processors):
     return blueprint
 
 
+def request_cache_key(prefix, *parts, **kwargs):
+    """Build a cache key for the current request.
+
+    The key is made of the given parts, the ``Accept`` and
+    ``Accept-Encoding`` headers and the request arguments, normalized so
+    that their order does not matter.
+
+    :param prefix: Prefix of the key (e.g. ``search``).
+    :param parts: Extra values identifying the response.
+    :param exclude: Request arguments not to take into account.
+    """
+    exclude = kwargs.get('exclude', ())
+    args = sorted(
+        (key, sorted(value.strip() for value in request.values.getlist(key)))
+        for key in request.values.keys() if key not in exclude
+    )
+    key = json.dumps([
+        [text_type(part) for part in parts],
+        request.headers.get('Accept', ''),
+        request.headers.get('Accept-Encoding', ''),
+        args,
+    ])
+    return '{0}:{1}'.format(prefix, sha1(key.encode('utf-8')).hexdigest())
+
+
+def cache_response(key, response, timeout=None):
+    """Store a response in the cache.
+
+    :param key: Cache key.
+    :param response: Response to store.
+    :param timeout: Expiration of the cache entry in seconds.
+    """
+    current_workflows_ui.set(
+        key,
+        (
+            response.get_data(),
+            response.status_code,
+            response.headers.to_wsgi_list(),
+        ),
+        timeout=timeout,
+    )
+
+
+def cached_response(key):
+    """Build a response from the cache if present.
+
+    :param key: Cache key.
+    :returns: The cached response or ``None``.
+    """
+    cached = current_workflows_ui.get(key)
+    if cached is None:
+        return None
+    body, status, headers = cached
+    return current_app.response_class(body, status=status, headers=headers)
+
+
+def deferred_fields_to_load(fields, exclude):
+    """Get the deferred fields of a record needed by a projection.
+
+    :param fields: Dotted fields to keep, all if empty.
+    :param exclude: Dotted fields to leave out.
+    :returns: The deferred fields to load, or ``None`` to load them all.
+    """
+    deferred = getattr(workflow_api_class, 'deferred_fields', None)
+    if not deferred or not (fields or exclude):
+        return None
+    loaded = set(deferred)
+    if fields:
+        loaded &= set(field.split('.', 1)[0] for field in fields)
+    return loaded - set(exclude)
+
+
+def project_record(record, fields, exclude):
+    """Restrict a record in place to the given dotted fields.
+
+    :param record: Record to restrict, which must not be committed.
+    :param fields: Dotted fields to keep, all if empty.
+    :param exclude: Dotted fields to leave out.
+    """
+    data = get_fields(record, fields) if fields else dict(record)
+    for field in exclude:
+        pop_field(data, field)
+    record.clear()
+    record.update(data)
+
+
+def search_result_links(search_result, endpoint, page, size, urlkwargs,
+                        max_result_window):
+    """Generate the self/prev/next links of a page of search results.
+
+    When the total hits are not tracked, a lower bound is set as total of
+    the search result.
+
+    :param search_result: Elasticsearch search result as a dictionary.
+    :param endpoint: Endpoint of the links.
+    :param page: Page of the search result.
+    :param size: Size of the pages.
+    :param urlkwargs: Other arguments of the search.
+    :param max_result_window: Maximum number of results to paginate.
+    :returns: Dictionary of links.
+    """
+    hits_count = len(search_result['hits']['hits'])
+    if search_result['hits'].get('total') is None:
+        # Total hits are not tracked, report what we know for sure.
+        search_result['hits']['total'] = dict(
+            value=(page-1)*size + hits_count,
+            relation='gte',
+        )
+    total, relation = get_total_hits(search_result)
+    return page_links(endpoint, page, size, urlkwargs, max_result_window,
+                      total, relation, hits_count)
+
+
+def raw_search_result_links(raw, endpoint, page, size, urlkwargs,
+                            max_result_window):
+    """Generate the self/prev/next links of a page of raw search results.
+
+    The number of hits of the page is deduced from the total, the page
+    being considered full when the total is not exact.
+
+    :param raw: JSON text of a search response.
+    :param endpoint: Endpoint of the links.
+    :param page: Page of the search result.
+    :param size: Size of the pages.
+    :param urlkwargs: Other arguments of the search.
+    :param max_result_window: Maximum number of results to paginate.
+    :returns: Dictionary of links.
+    """
+    total, relation = get_raw_total_hits(raw)
+    if total is None:
+        total = page * size
+    hits_count = size
+    if relation == 'eq':
+        hits_count = min(size, max(total - (page-1)*size, 0))
+    return page_links(endpoint, page, size, urlkwargs, max_result_window,
+                      total, relation, hits_count)
+
+
+def page_links(endpoint, page, size, urlkwargs, max_result_window, total,
+               relation, hits_count):
+    """Generate the self/prev/next links of a page of results.
+
+    :param endpoint: Endpoint of the links.
+    :param page: Page of the search result.
+    :param size: Size of the pages.
+    :param urlkwargs: Other arguments of the search.
+    :param max_result_window: Maximum number of results to paginate.
+    :param total: Total number of hits.
+    :param relation: ``'eq'`` if the total is exact, ``'gte'`` otherwise.
+    :param hits_count: Number of hits of the page.
+    :returns: Dictionary of links.
+    """
+    urlkwargs = dict(urlkwargs, size=size, _external=True)
+    links = dict(self=url_for(endpoint, page=page, **urlkwargs))
+    if page > 1:
+        links['prev'] = url_for(endpoint, page=page-1, **urlkwargs)
+    has_next = size * page < total or (
+        relation != 'eq' and hits_count == size
+    )
+
+    if has_next and size * page < max_result_window:
+        links['next'] = url_for(endpoint, page=page+1, **urlkwargs)
+    return links
+
+
 def pass_workflow_object(f):
     """Retrieve workflow object to use in views."""
     @wraps(f)
@@ -202,7 +495,10 @@ class WorkflowsListResource(ContentNegotiatedMethodView):
                  record_loaders=None,
                  search_serializers=None, default_media_type=None,
                  max_result_window=None, search_factory=None,
-                 item_links_factory=None, workflow_api_class=None, **kwargs):
+                 item_links_factory=None, workflow_api_class=None,
+                 search_cache_timeout=None, search_options=None,
+                 search_template=None, list_search_index=None,
+                 list_search_template=None, **kwargs):
         """Constructor."""
         super(WorkflowsListResource, self).__init__(
             method_serializers={
@@ -219,8 +515,19 @@ class WorkflowsListResource(ContentNegotiatedMethodView):
             index=search_index,
             doc_type=search_type
         ).params(version=True)
+        self.list_searcher = None
+        if list_search_index:
+            self.list_searcher = RecordsSearch(
+                index=list_search_index,
+                doc_type=search_type
+            ).params(version=True)
         self.max_result_window = max_result_window
         self.search_factory = partial(search_factory, self)
+        self.search_cache_timeout = search_cache_timeout
+        self.search_options = search_options or {}
+        self.search_index = search_index
+        self.search_template = search_template
+        self.list_search_template = list_search_template
 
     @action_read_permission.require(http_exception=403)
     def get(self, **kwargs):
@@ -234,40 +541,262 @@ class WorkflowsListResource(ContentNegotiatedMethodView):
         if page * size >= self.max_result_window:
             raise RESTException("Too many results to show!")
 
-        urlkwargs = dict()
-        search = self.searcher[(page-1)*size:page*size]
+        cache_key = None
+        if self.search_cache_timeout:
+            cache_key = request_cache_key(
+                'search',
+                current_workflows_ui.search_generation,
+                page,
+                size,
+                exclude=('page', 'size'),
+            )
+            response = cached_response(cache_key)
+            if response is not None:
+                return response
+            if not current_workflows_ui.search_cache_settled:
+                # The last changes might not be searchable yet.
+                cache_key = None
 
-        search, qs_kwargs = self.search_factory(search)
+        urlkwargs = dict()
+        searcher = self.searcher
+        template = self.search_template
+        if self.list_searcher is not None and not request.values.get('q'):
+            # The lean list index holds all the fields lists and facets
+            # need, but queries can target any field of the full records.
+            searcher = self.list_searcher
+            template = self.list_search_template or SearchTemplate(
+                self.search_index, current_app.config, list_index=True)
+        search = searcher[(page-1)*size:page*size]
+
+        search, qs_kwargs = self.search_factory(search, template=template)
+        search = search.extra(**self.search_options)
 
         urlkwargs.update(qs_kwargs)
-        current_app.logger.debug(json.dumps(search.to_dict(), indent=4))
+        # Keep the format chosen with the query argument in the links.
+        format_arg = current_app.config.get('REST_MIMETYPE_QUERY_ARG_NAME')
+        if format_arg and format_arg in request.args:
+            urlkwargs[format_arg] = request.args[format_arg]
+        if current_app.logger.isEnabledFor(logging.DEBUG):
+            current_app.logger.debug(json.dumps(search.to_dict(), indent=4))
+
+        serializer = self.match_serializers(
+            *self.get_method_serializers(request.method))
+        if getattr(serializer, 'raw_search', False):
+            # Pass the response of Elasticsearch through without decoding.
+            search_result = execute_raw(search)
+            links = raw_search_result_links(
+                search_result, '.{0}'.format(self.view_name), page, size,
+                urlkwargs, self.max_result_window)
+            response = self.make_response(
+                search_result=search_result,
+                links=links,
+            )
+            if cache_key and response.status_code == 200:
+                cache_response(
+                    cache_key, response, timeout=self.search_cache_timeout)
+            return response
+
         # Execute search
-        search_result = search.execute()
+        search_result = search.execute().to_dict()
+
+        links = search_result_links(
+            search_result, '.{0}'.format(self.view_name), page, size,
+            urlkwargs, self.max_result_window)
 
-        # Generate links for prev/next
-        urlkwargs.update(
-            size=size,
-            _external=True,
+        response = self.make_response(
+            search_result=search_result,
+            links=links,
         )
-        endpoint = '.{0}'.format(self.view_name)
-        links = dict(self=url_for(endpoint, page=page, **urlkwargs))
-        if page > 1:
-            links['prev'] = url_for(endpoint, page=page-1, **urlkwargs)
-        if ES_VERSION[0] >= 7:
-            all_results_count = int(search_result.hits.total.value)
-        else:
-            all_results_count = int(search_result.hits.total)
+        if cache_key and response.status_code == 200 and \
+                not response.is_streamed:
+            cache_response(
+                cache_key, response, timeout=self.search_cache_timeout)
+        return response
+
+
+class WorkflowsMultiSearchResource(ContentNegotiatedMethodView):
+    """Resource for running several named searches at once."""
 
-        if size * page < all_results_count and \
-                size * page < self.max_result_window:
-            links['next'] = url_for(endpoint, page=page+1, **urlkwargs)
+    view_name = 'workflow_multi_search'
+
+    def __init__(self, search_index=None, search_type=None,
+                 max_result_window=None, search_factory=None,
+                 search_options=None, search_template=None,
+                 multi_search_max_size=None, **kwargs):
+        """Constructor."""
+        super(WorkflowsMultiSearchResource, self).__init__(**kwargs)
+        self.searcher = RecordsSearch(
+            index=search_index,
+            doc_type=search_type
+        ).extra(version=True)
+        self.max_result_window = max_result_window
+        self.search_factory = partial(search_factory, self)
+        self.search_options = search_options or {}
+        self.search_template = search_template
+        self.multi_search_max_size = multi_search_max_size
+
+    @action_read_permission.require(http_exception=403)
+    def post(self, **kwargs):
+        """Run several searches in a single Elasticsearch request.
+
+        The body maps the name of each search to its arguments, which are
+        the ones of the list endpoint, e.g.::
+
+            {
+                "halted": {"status": ["HALTED"], "size": 5},
+                "errors": {"status": ["ERROR"], "sort": "mostrecent"}
+            }
+
+        :returns: the search result of each name.
+        """
+        queries = request.get_json(silent=True)
+        if not isinstance(queries, dict) or not all(
+                isinstance(query, dict) or query is None
+                for query in queries.values()):
+            raise InvalidMultiSearchRESTError()
+        if self.multi_search_max_size and \
+                len(queries) > self.multi_search_max_size:
+            raise InvalidMultiSearchRESTError(
+                description='At most {0} searches are allowed.'.format(
+                    self.multi_search_max_size))
+
+        multi_search = MultiSearch(using=current_search_client)
+        pages = []
+        for name, query in sorted(queries.items()):
+            args = MultiDict()
+            for key, value in (query or {}).items():
+                for item in (value if isinstance(value, list) else [value]):
+                    args.add(key, text_type(item))
+
+            page = args.get('page', 1, type=int)
+            size = args.get('size', 10, type=int)
+            if page * size >= self.max_result_window:
+                raise RESTException("Too many results to show!")
+
+            search = self.searcher[(page-1)*size:page*size]
+            search, urlkwargs = self.search_factory(search, args=args)
+            search = search.extra(**self.search_options)
+
+            multi_search = multi_search.add(search)
+            pages.append((name, page, size, urlkwargs.to_dict(flat=False)))
+
+        search_results = {}
+        links = {}
+        endpoint = '.{0}'.format(WorkflowsListResource.view_name)
+        for (name, page, size, urlkwargs), response in zip(
+                pages, multi_search.execute()):
+            search_results[name] = response.to_dict()
+            links[name] = search_result_links(
+                search_results[name], endpoint, page, size,
+                urlkwargs, self.max_result_window)
 
         return self.make_response(
-            search_result=search_result.to_dict(),
+            search_results=search_results,
             links=links,
         )
 
 
+class WorkflowsExportResource(ContentNegotiatedMethodView):
+    """Resource for exporting all the records matching a search."""
+
+    view_name = 'workflow_export'
+
+    def __init__(self, search_index=None, search_type=None,
+                 search_factory=None, search_template=None, **kwargs):
+        """Constructor."""
+        super(WorkflowsExportResource, self).__init__(**kwargs)
+        self.searcher = RecordsSearch(
+            index=search_index,
+            doc_type=search_type
+        )
+        self.search_factory = partial(search_factory, self)
+        self.search_template = search_template
+
+    @action_read_permission.require(http_exception=403)
+    def get(self, **kwargs):
+        """Export the records matching a search.
+
+        Accepts the same arguments as the list endpoint, except for the
+        pagination and the aggregations. The matching records are scrolled
+        through and streamed to the client as they are read.
+
+        :returns: a streamed response with all the matching records.
+        """
+        search, _ = self.search_factory(self.searcher, aggs=[])
+        fields = search.to_dict().get('_source', {}).get('includes')
+
+        return self.make_response(
+            (hit.to_dict() for hit in search.scan()),
+            fields=fields,
+        )
+
+
+def _summary_buckets(aggregations, names):
+    """Build the nested counts of the summary aggregations."""
+    name = names[0]
+    result = {}
+    for bucket in aggregations[name]['buckets']:
+        counts = dict(count=bucket['doc_count'])
+        if len(names) > 1:
+            counts[names[1]] = _summary_buckets(bucket, names[1:])
+        result[bucket['key']] = counts
+    return result
+
+
+class WorkflowsSummaryResource(ContentNegotiatedMethodView):
+    """Resource for the counts of records per status, type and workflow."""
+
+    view_name = 'workflow_summary'
+
+    def __init__(self, search_index=None, search_type=None,
+                 summary_cache_timeout=None, search_template=None,
+                 **kwargs):
+        """Constructor."""
+        super(WorkflowsSummaryResource, self).__init__(**kwargs)
+        self.searcher = RecordsSearch(
+            index=search_index,
+            doc_type=search_type
+        ).params(request_cache=True)
+        self.search_index = search_index
+        self.summary_cache_timeout = summary_cache_timeout
+        self.search_template = search_template
+
+    def _summary(self):
+        """Compute the summary with an aggregation only search."""
+        template = SearchTemplate.get(
+            self.search_template or self.search_index)
+
+        search = self.searcher.extra(size=0)
+        if ES_VERSION[0] >= 7:
+            search = search.extra(track_total_hits=True)
+        if template.summary_agg:
+            name, definition = template.summary_agg
+            search.aggs.bucket(name, A(definition))
+
+        search_result = search.execute().to_dict()
+        summary = dict(total=get_total_hits(search_result)[0])
+        if template.summary_agg:
+            summary[template.summary_names[0]] = _summary_buckets(
+                search_result['aggregations'],
+                template.summary_names,
+            )
+        return summary
+
+    @action_read_permission.require(http_exception=403)
+    def get(self, **kwargs):
+        """Get the number of records per status, data type and workflow.
+
+        :returns: the total and the nested counts of the records.
+        """
+        cache_key = 'summary:{0}'.format(self.search_index)
+        summary = current_workflows_ui.get(cache_key)
+        if summary is None:
+            summary = self._summary()
+            current_workflows_ui.set(
+                cache_key, summary, timeout=self.summary_cache_timeout)
+        return self.make_response(summary)
+
+
 class WorkflowObjectResource(ContentNegotiatedMethodView):
     """Resource for workflow items."""
 
@@ -278,8 +807,10 @@ class WorkflowObjectResource(ContentNegotiatedMethodView):
                  delete_permission_factory=None, default_media_type=None,
                  links_factory=None,
                  loaders=None,
+                 item_cache_timeout=None,
                  **kwargs):
         """Constructor."""
+        self.item_cache_timeout = item_cache_timeout
         super(WorkflowObjectResource, self).__init__(
             method_serializers={
                 'DELETE': {'*/*': lambda *args: make_response(*args), },
@@ -293,21 +824,69 @@ class WorkflowObjectResource(ContentNegotiatedMethodView):
             default_media_type=default_media_type,
             **kwargs)
 
-    @pass_workflow_object
     @action_read_permission.require(http_exception=403)
-    def get(self, workflow_ui_object, **kwargs):
+    def get(self, object_id, **kwargs):
         """Get a record.
 
-        :param workflow_ui_object: workflow_api_class object.
+        Conditional requests are answered from the cached modification date
+        of the object, before loading it. Responses are cached by object
+        and modification date.
+
+        The record can be restricted to the dotted fields given in the
+        ``fields`` request argument, or without the ones of ``exclude``;
+        the columns of the fields left out are not loaded.
+
+        :param object_id: Workflow object identifier.
         :returns: The requested record.
         """
-        etag_value = text_type(workflow_ui_object.model.modified)
-        etag = sha1(etag_value.encode('utf-8')).hexdigest()
-        self.check_etag(etag)
-        self.check_if_modified_since(
-            workflow_ui_object.model.modified, etag=etag)
-
-        return self.make_response(workflow_ui_object)
+        fields = split_values(request.args, 'fields')
+        exclude = split_values(request.args, 'exclude')
+        modified = current_workflows_ui.object_modified(object_id)
+        if modified is None:
+            abort(404)
+        self._check_modified(modified)
+
+        if self.item_cache_timeout:
+            response = cached_response(
+                request_cache_key('item', object_id, modified))
+            if response is not None:
+                return response
+
+        loaded_fields = deferred_fields_to_load(fields, exclude)
+        try:
+            if loaded_fields is None:
+                workflow_ui_object = workflow_api_class.get_record(object_id)
+            else:
+                workflow_ui_object = workflow_api_class.get_record(
+                    object_id, fields=loaded_fields)
+        except WorkflowsMissingObject:
+            return abort(404)
+        if workflow_ui_object.model.modified != modified:
+            modified = workflow_ui_object.model.modified
+            current_workflows_ui.invalidate_object(object_id)
+            self._check_modified(modified)
+        if fields or exclude:
+            project_record(workflow_ui_object, fields, exclude)
+
+        response = self.make_response(workflow_ui_object)
+        if self.item_cache_timeout and response.status_code == 200 and \
+                not response.is_streamed:
+            cache_response(
+                request_cache_key('item', object_id, modified),
+                response,
+                timeout=self.item_cache_timeout,
+            )
+        return response
+
+    def _check_modified(self, modified):
+        """Check the conditional request headers against a modification."""
+        etag = sha1(text_type(modified).encode('utf-8')).hexdigest()
+        if request.if_none_match.contains_weak(etag):
+            raise SameWeakContentException(etag)
+        modified = modified.replace(microsecond=0)
+        if request.if_modified_since and \
+                modified <= request.if_modified_since:
+            raise SameWeakContentException(etag, last_modified=modified)
 
     @pass_workflow_object
     @action_write_permission.require(http_exception=403)
@@ -326,6 +905,26 @@ class WorkflowObjectResource(ContentNegotiatedMethodView):
 
         return self.make_response(workflow_ui_object)
 
+    @pass_workflow_object
+    @action_write_permission.require(http_exception=403)
+    def patch(self, workflow_ui_object, **kwargs):
+        """Modify a workflow object with a JSON Patch (RFC 6902).
+
+        :param workflow_ui_object: workflow_api_class object.
+        :returns: The modified record.
+        """
+        data = request.get_json(force=True)
+        if not isinstance(data, list):
+            raise PatchJSONFailureRESTError()
+        try:
+            workflow_ui_object.apply_patch(data)
+        except (JsonPatchException, JsonPointerException, KeyError):
+            db.session.rollback()
+            raise PatchJSONFailureRESTError()
+        db.session.commit()
+
+        return self.make_response(workflow_ui_object)
+
     @pass_workflow_object
     @action_write_permission.require(http_exception=403)
     def delete(self, workflow_ui_object, **kwargs):
@@ -343,6 +942,52 @@ class WorkflowObjectResource(ContentNegotiatedMethodView):
         return '', 204
 
 
+class WorkflowObjectsBatchResource(ContentNegotiatedMethodView):
+    """Resource for getting many workflow objects at once."""
+
+    view_name = 'workflow_batch'
+
+    def __init__(self, batch_max_size=None, **kwargs):
+        """Constructor."""
+        super(WorkflowObjectsBatchResource, self).__init__(**kwargs)
+        self.batch_max_size = batch_max_size
+
+    @action_read_permission.require(http_exception=403)
+    def post(self, **kwargs):
+        """Get the workflow objects of a list of identifiers.
+
+        The body is a JSON list of identifiers. The objects are queried in
+        chunks while being streamed back in the same order, the missing
+        ones being skipped. The ``fields`` and ``exclude`` request
+        arguments restrict the records as on the item endpoint.
+
+        :returns: a streamed response with the requested records.
+        """
+        ids = request.get_json(force=True)
+        if not isinstance(ids, list):
+            raise InvalidBatchRESTError()
+        if self.batch_max_size and len(ids) > self.batch_max_size:
+            raise InvalidBatchRESTError(
+                description='Too many objects requested!')
+        try:
+            ids = [int(id_) for id_ in ids]
+        except (TypeError, ValueError):
+            raise InvalidBatchRESTError()
+
+        fields = split_values(request.args, 'fields')
+        exclude = split_values(request.args, 'exclude')
+        loaded_fields = deferred_fields_to_load(fields, exclude)
+
+        def dumps():
+            for record in workflow_api_class.iter_records(
+                    ids, fields=loaded_fields):
+                if fields or exclude:
+                    project_record(record, fields, exclude)
+                yield record.dumps()
+
+        return self.make_response(dumps())
+
+
 class WorkflowActionResource(ContentNegotiatedMethodView):
     """Workflow actions resource."""
 
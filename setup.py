@@ -54,12 +54,31 @@ EXTRAS_REQUIRE = {
     'sqlite': [
         'invenio-db>=1.0.0a9',
     ],
+    'orjson': [
+        'orjson>=3.0',
+    ],
+    'ujson': [
+        'ujson>=5.4',
+    ],
+    'rapidjson': [
+        'python-rapidjson>=1.0',
+    ],
+    'msgpack': [
+        'msgpack>=0.6',
+    ],
+    'cbor': [
+        'cbor2>=4.0',
+    ],
+    'brotli': [
+        'brotli>=1.0',
+    ],
     'tests': TESTS_REQUIRE,
 }
 
 EXTRAS_REQUIRE['all'] = []
 for name, reqs in EXTRAS_REQUIRE.items():
-    if name in ('postgresql', 'sqlite'):
+    if name in ('postgresql', 'sqlite', 'orjson', 'ujson', 'rapidjson',
+                'msgpack', 'cbor', 'brotli'):
         continue
     EXTRAS_REQUIRE['all'].extend(reqs)
 
@@ -80,6 +99,7 @@ INSTALL_REQUIRES = [
     'invenio-rest',
     'flask-login',
     'invenio-workflows~=7.0',
+    'jsonpatch>=1.15',
     'flask-principal',
 ]
 
@@ -34,9 +34,44 @@ from flask import Flask
 from flask_babelex import Babel
 from flask_cli import FlaskCLI
 from flask_login import LoginManager
-from invenio_db import InvenioDB
+from flask_principal import Principal
+from invenio_access.permissions import Permission
+from invenio_db import InvenioDB, db
 from invenio_workflows import InvenioWorkflows
-from invenio_workflows_ui import InvenioWorkflowsUI
+from mock import patch
+
+from invenio_workflows_ui import InvenioWorkflowsUI, InvenioWorkflowsUIREST
+
+
+class DictCache(object):
+    """Minimal in-memory cache."""
+
+    def __init__(self):
+        """Initialize cache."""
+        self.data = {}
+
+    def get(self, key):
+        """Get a value."""
+        return self.data.get(key)
+
+    def set(self, key, value, timeout=None):
+        """Set a value."""
+        self.data[key] = value
+
+    def delete(self, key):
+        """Delete a value."""
+        self.data.pop(key, None)
+
+    def inc(self, key, delta=1):
+        """Increment a counter."""
+        self.data[key] = self.data.get(key, 0) + delta
+        return self.data[key]
+
+
+@pytest.fixture()
+def cache():
+    """In-memory cache fixture."""
+    return DictCache()
 
 
 @pytest.fixture()
@@ -55,3 +90,34 @@ def app():
     InvenioWorkflows(app)
     InvenioWorkflowsUI(app)
     return app
+
+
+@pytest.fixture()
+def rest_app_config():
+    """Extra configuration of the REST application fixture."""
+    return {}
+
+
+@pytest.fixture()
+def rest_app(rest_app_config):
+    """Flask application fixture with the REST API, granting all actions."""
+    app = Flask('testapp')
+    app.config.update(
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI=os.environ.get(
+            'SQLALCHEMY_DATABASE_URI', 'sqlite:///test.db')
+    )
+    app.config.update(rest_app_config)
+    Babel(app)
+    FlaskCLI(app)
+    LoginManager(app)
+    Principal(app)
+    InvenioDB(app)
+    InvenioWorkflows(app)
+    InvenioWorkflowsUIREST(app)
+    with app.app_context():
+        db.create_all()
+        with patch.object(Permission, 'allows', return_value=True):
+            yield app
+        db.session.remove()
+        db.drop_all()
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2019 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+
+"""Cache tests."""
+
+from __future__ import absolute_import, print_function
+
+from flask import Response
+
+from invenio_workflows_ui.views.rest import (
+    cache_response,
+    cached_response,
+    request_cache_key,
+)
+
+
+def test_request_cache_key(app):
+    """Test the cache key of a request."""
+    def key(url, **kwargs):
+        with app.test_request_context(url, **kwargs):
+            return request_cache_key('search', 1, exclude=('page',))
+
+    assert key('/?a=1&b=2') == key('/?b=2&a=1')
+    assert key('/?a=1&page=2') == key('/?a=1&page=3')
+    assert key('/?a=1') != key('/?a=2')
+    assert key('/?a=1') != key('/?a=1', headers={'Accept': 'text/csv'})
+    assert key('/?a=1') != key(
+        '/?a=1', headers={'Accept-Encoding': 'gzip'})
+    with app.test_request_context('/?a=1'):
+        assert request_cache_key('search', 1) != \
+            request_cache_key('search', 2)
+
+
+def test_cached_response(app, cache):
+    """Test storing and reading a response from the cache."""
+    state = app.extensions['invenio-workflows-ui']
+    with app.test_request_context('/'):
+        cache_response('key', Response('body', status=201))
+        assert cached_response('key') is None
+
+        state.cache = cache
+        assert cached_response('key') is None
+        cache_response('key', Response(
+            'body', status=201, headers={'ETag': '"1"'}))
+        response = cached_response('key')
+        assert response.get_data() == b'body'
+        assert response.status_code == 201
+        assert response.headers['ETag'] == '"1"'
+
+
+def test_invalidate_search_cache(app, cache):
+    """Test the invalidation of the cached search responses."""
+    state = app.extensions['invenio-workflows-ui']
+    state.invalidate_search_cache()
+    assert state.search_generation == 0
+    assert state.search_cache_settled
+
+    state.cache = cache
+    assert state.search_generation == 0
+    assert state.search_cache_settled
+    state.invalidate_search_cache()
+    state.invalidate_search_cache()
+    assert state.search_generation == 2
+    assert not state.search_cache_settled
+
+    app.config['WORKFLOWS_UI_SEARCH_REFRESH_INTERVAL'] = 0
+    assert state.search_cache_settled
+
+
+def test_object_modified(app, cache):
+    """Test the cached modification date of a workflow object."""
+    state = app.extensions['invenio-workflows-ui']
+    state.cache = cache
+    state.set('modified:1', 'date')
+    assert state.object_modified(1) == 'date'
+    state.invalidate_object(1)
+    assert state.get('modified:1') is None
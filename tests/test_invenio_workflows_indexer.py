@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2019 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+
+"""Indexer tests."""
+
+from __future__ import absolute_import, print_function
+
+from datetime import datetime
+
+from invenio_workflows import ObjectStatus, WorkflowObject
+from mock import MagicMock, patch
+
+from invenio_workflows_ui.api import (
+    WorkflowUIRecord,
+    record_to_index,
+    record_to_indices,
+)
+from invenio_workflows_ui.indexer import WorkflowIndexer
+from invenio_workflows_ui.tasks import batch_reindex
+
+DATA_TYPES = dict(
+    hep=dict(search_index='hep', search_type='hep',
+             cold_search_index='hep-cold', list_search_index='hep-list'),
+    authors=dict(search_index='authors', search_type='authors'),
+)
+
+
+def _record(data_type, status):
+    """Build a record of the given data type and status."""
+    return {'_workflow': {'data_type': data_type, 'status': status}}
+
+
+def test_record_to_index(app):
+    """Test the hot and cold index of records."""
+    app.config['WORKFLOWS_UI_DATA_TYPES'] = DATA_TYPES
+    with app.app_context():
+        assert record_to_index(_record('hep', 'HALTED')) == ('hep', 'hep')
+        assert record_to_index(_record('hep', 'COMPLETED')) == (
+            'hep-cold', 'hep')
+        assert record_to_index(_record('authors', 'COMPLETED')) == (
+            'authors', 'authors')
+        assert record_to_index(_record('unknown', 'HALTED')) == (None, None)
+
+
+def test_record_to_indices(app):
+    """Test all the indices of records."""
+    app.config['WORKFLOWS_UI_DATA_TYPES'] = DATA_TYPES
+    with app.app_context():
+        assert record_to_indices(_record('hep', 'HALTED')) == [
+            ('hep', 'hep'), ('hep-cold', 'hep')]
+        assert record_to_indices(_record('authors', 'HALTED')) == [
+            ('authors', 'authors')]
+        assert record_to_indices(_record('unknown', 'HALTED')) == []
+
+
+def test_prepare_record_cold_excludes(app):
+    """Test that cold records leave out the cold excluded fields."""
+    app.config['WORKFLOWS_UI_DATA_TYPES'] = DATA_TYPES
+    record = MagicMock(
+        dumps=lambda: {'metadata': {'title': 'foo'}, '_extra_data': {}},
+        model=MagicMock(created=datetime(2019, 1, 1),
+                        modified=datetime(2019, 1, 2)),
+    )
+    with app.app_context():
+        hot = WorkflowIndexer._prepare_record(record, 'hep', 'hep')
+        cold = WorkflowIndexer._prepare_record(record, 'hep-cold', 'hep')
+
+    assert '_extra_data' in hot
+    assert '_extra_data' not in cold
+    assert cold['metadata'] == {'title': 'foo'}
+    assert cold['_updated'] == '2019-01-02T00:00:00+00:00'
+
+
+def test_index_moves_record(rest_app):
+    """Test that records are removed from their previous index."""
+    rest_app.config['WORKFLOWS_UI_DATA_TYPES'] = DATA_TYPES
+    with patch.object(WorkflowUIRecord.indexer, 'client') as client:
+        def indices():
+            indices = [
+                call[1]['index'] for call in client.index.call_args_list]
+            client.index.reset_mock()
+            return indices
+
+        obj = WorkflowObject.create({}, data_type='hep')
+        obj.save()
+        obj.save(status=ObjectStatus.HALTED)
+
+        assert indices() == ['hep', 'hep-list', 'hep', 'hep-list']
+        assert not client.delete.called
+
+        obj.save(status=ObjectStatus.COMPLETED)
+
+        assert indices() == ['hep-cold', 'hep-list']
+        client.delete.assert_called_once_with(
+            id=str(obj.id), index='hep', doc_type='hep', ignore=404)
+
+        obj.save()
+
+        assert indices() == ['hep-cold', 'hep-list']
+        assert client.delete.call_count == 1
+
+
+def test_prepare_list_record(app):
+    """Test the lean records of the list index."""
+    app.config['WORKFLOWS_UI_LIST_INDEX_FIELDS'] = [
+        'id', '_workflow.status', 'metadata.title', 'metadata.missing']
+    with app.app_context():
+        assert WorkflowIndexer._prepare_list_record({
+            'id': 1,
+            '_workflow': {'status': 'HALTED', 'data_type': 'hep'},
+            'metadata': {'title': 'foo', 'abstract': 'bar'},
+            '_extra_data': {},
+        }) == {
+            'id': 1,
+            '_workflow': {'status': 'HALTED'},
+            'metadata': {'title': 'foo'},
+        }
+
+
+def test_batch_reindex(rest_app):
+    """Test the bulk actions of the reindexing."""
+    rest_app.config['WORKFLOWS_UI_DATA_TYPES'] = DATA_TYPES
+    actions = []
+
+    def bulk(client, bulk_actions, **kwargs):
+        actions.extend(bulk_actions)
+        return 1, [
+            {'delete': {'_id': 1, 'status': 404}},
+            {'index': {'_id': 2, 'status': 500}},
+        ]
+
+    with patch.object(WorkflowUIRecord.indexer, 'client'):
+        obj = WorkflowObject.create({}, data_type='hep')
+        obj.save(status=ObjectStatus.COMPLETED)
+    with patch('elasticsearch.helpers.bulk', side_effect=bulk):
+        result = batch_reindex([obj.id], 10)
+
+    assert [(action['_op_type'], action['_index']) for action in actions] == [
+        ('index', 'hep-cold'), ('delete', 'hep'), ('index', 'hep-list')]
+    assert set(actions[2]['_source']) == {
+        'id', '_workflow', '_created', '_updated'}
+    assert result['success'] == 1
+    assert result['failures'] == [repr({'index': {'_id': 2, 'status': 500}})]
@@ -0,0 +1,523 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2019 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+
+"""REST API tests."""
+
+from __future__ import absolute_import, print_function
+
+import csv
+import json
+
+import pytest
+from invenio_db import db
+from invenio_workflows import WorkflowObject
+from mock import MagicMock, patch
+from sqlalchemy import event
+
+from invenio_workflows_ui.api import WorkflowUIRecord
+from invenio_workflows_ui.config import WORKFLOWS_UI_REST_ENDPOINT
+from invenio_workflows_ui.search import SearchTemplate, \
+    default_search_factory
+from invenio_workflows_ui.serializers import json_search_serializer
+from invenio_workflows_ui.views.rest import WorkflowsListResource
+
+
+def _search_response(total):
+    """Build the response of a search."""
+    return MagicMock(to_dict=MagicMock(return_value={
+        'hits': {'total': total, 'hits': []},
+    }))
+
+
+def _create_object(data):
+    """Create and commit a workflow object."""
+    with patch.object(WorkflowUIRecord.indexer, 'client'):
+        obj = WorkflowObject.create(data)
+        obj.save()
+    db.session.commit()
+    return obj.id
+
+
+def test_multi_search(rest_app):
+    """Test running several searches at once."""
+    with rest_app.test_client() as client, \
+            patch('invenio_workflows_ui.views.rest.MultiSearch.execute',
+                  return_value=[_search_response(1), _search_response(2)]):
+        res = client.post('/workflows/search', data=json.dumps({
+            'halted': {'status': 'HALTED', 'size': 5},
+            'errors': None,
+        }), content_type='application/json')
+
+        assert res.status_code == 200
+        data = json.loads(res.get_data(as_text=True))
+        assert data['errors']['hits']['total'] == 1
+        assert data['halted']['hits']['total'] == 2
+        assert 'size=5' in data['halted']['links']['self']
+
+
+def test_multi_search_invalid(rest_app):
+    """Test the rejection of invalid multi-search requests."""
+    def post(data):
+        with rest_app.test_client() as client:
+            return client.post(
+                '/workflows/search', data=json.dumps(data),
+                content_type='application/json',
+            ).status_code
+
+    assert post(['a']) == 400
+    assert post({'a': 'x'}) == 400
+    assert post({'a': [1]}) == 400
+    assert post({str(i): {} for i in range(11)}) == 400
+
+
+@pytest.mark.parametrize('rest_app_config', [dict(
+    WORKFLOWS_UI_REST_ENDPOINT=dict(
+        WORKFLOWS_UI_REST_ENDPOINT, list_search_index='workflows-list'),
+)])
+def test_list_search_index(rest_app):
+    """Test that only searches without a query use the list index."""
+    indices = []
+
+    def execute(search):
+        indices.append(search._index)
+        return _search_response(0)
+
+    with rest_app.test_client() as client, patch(
+            'invenio_workflows_ui.views.rest.RecordsSearch.execute',
+            autospec=True, side_effect=execute):
+        assert client.get('/workflows/?status=HALTED').status_code == 200
+        assert client.get('/workflows/?q=title:foo').status_code == 200
+
+    assert indices == [['workflows-list'], ['workflows']]
+
+
+@pytest.mark.parametrize('rest_app_config', [dict(
+    WORKFLOWS_UI_REST_ENDPOINT=dict(
+        WORKFLOWS_UI_REST_ENDPOINT, list_search_index='workflows-list'),
+    WORKFLOWS_UI_DATA_TYPES=dict(
+        hep=dict(search_index='holdingpen-hep',
+                 list_search_index='holdingpen-hep-list'),
+    ),
+)])
+@pytest.mark.parametrize('precompiled', [True, False])
+def test_list_search_index_data_type(rest_app, precompiled):
+    """Test that filtered list searches use the list index of the type."""
+    indices = []
+
+    def execute(search):
+        indices.append(search._index)
+        return _search_response(0)
+
+    resource = WorkflowsListResource(
+        search_serializers={'application/json': json_search_serializer},
+        default_media_type='application/json',
+        search_index='workflows',
+        list_search_index='workflows-list',
+        search_factory=default_search_factory,
+        max_result_window=10000,
+        search_template=SearchTemplate('workflows', rest_app.config)
+        if precompiled else None,
+        list_search_template=SearchTemplate(
+            'workflows', rest_app.config, list_index=True)
+        if precompiled else None,
+    )
+    search_template = resource.search_template
+
+    for url in ('/workflows/?data_type=hep',
+                '/workflows/?data_type=hep&q=title:foo'):
+        with rest_app.test_request_context(url), patch(
+                'invenio_workflows_ui.views.rest.RecordsSearch.execute',
+                autospec=True, side_effect=execute):
+            rest_app.preprocess_request()
+            assert resource.get().status_code == 200
+
+    assert indices == [['holdingpen-hep-list'], ['holdingpen-hep']]
+    assert resource.search_template is search_template
+
+
+def test_item_conditional_requests(rest_app, cache):
+    """Test the conditional requests on workflow objects."""
+    rest_app.extensions['invenio-workflows-ui'].cache = cache
+    object_id = _create_object({'title': 'foo'})
+    url = '/workflows/{0}'.format(object_id)
+
+    with rest_app.test_client() as client:
+        res = client.get(url)
+        etag = res.headers['ETag']
+        last_modified = res.headers['Last-Modified']
+
+        assert res.status_code == 200
+        assert etag.startswith('W/')
+
+        res = client.get(url, headers={'If-None-Match': etag})
+
+        assert res.status_code == 304
+        assert res.headers['ETag'] == etag
+        assert client.get(url, headers={
+            'If-None-Match': etag[2:]}).status_code == 304
+
+        res = client.get(url, headers={'If-Modified-Since': last_modified})
+
+        assert res.status_code == 304
+        assert res.headers['ETag'] == etag
+        assert client.get(
+            url, headers={'If-None-Match': '"other"'}).status_code == 200
+        assert client.get('/workflows/0').status_code == 404
+        assert client.get(
+            '/workflows/0', headers={'If-None-Match': etag}
+        ).status_code == 404
+
+
+def test_item_cache_invalidated_after_commit(rest_app, cache):
+    """Test that cached workflow objects are invalidated on commit."""
+    state = rest_app.extensions['invenio-workflows-ui']
+    state.cache = cache
+    object_id = _create_object({'title': 'foo'})
+    url = '/workflows/{0}'.format(object_id)
+    key = 'modified:{0}'.format(object_id)
+
+    with rest_app.test_client() as client:
+        res = client.get(url)
+        etag = res.headers['ETag']
+
+        assert json.loads(res.get_data(as_text=True))[
+            'metadata'] == {'title': 'foo'}
+        assert client.get(
+            url, headers={'If-None-Match': etag}).status_code == 304
+
+        with patch.object(WorkflowUIRecord.indexer, 'client'):
+            obj = WorkflowObject.get(object_id)
+            obj.data['title'] = 'bar'
+            obj.save()
+
+        assert state.get(key) is not None
+        db.session.commit()
+        assert state.get(key) is None
+
+        res = client.get(url, headers={'If-None-Match': etag})
+
+        assert res.status_code == 200
+        assert json.loads(res.get_data(as_text=True))[
+            'metadata'] == {'title': 'bar'}
+
+
+def test_item_cache_invalidated_after_model_update(rest_app, cache):
+    """Test that updates bypassing save invalidate the cached items."""
+    state = rest_app.extensions['invenio-workflows-ui']
+    state.cache = cache
+    object_id = _create_object({'title': 'foo'})
+    url = '/workflows/{0}'.format(object_id)
+
+    with rest_app.test_client() as client:
+        etag = client.get(url).headers['ETag']
+
+        assert state.get('modified:{0}'.format(object_id)) is not None
+
+        obj = WorkflowObject.get(object_id)
+        obj.model.data = {'title': 'bar'}
+        db.session.commit()
+
+        assert state.get('modified:{0}'.format(object_id)) is None
+
+        res = client.get(url, headers={'If-None-Match': etag})
+
+        assert res.status_code == 200
+        assert json.loads(res.get_data(as_text=True))[
+            'metadata'] == {'title': 'bar'}
+
+
+def _patch(client, object_id, operations):
+    """Send a JSON Patch to a workflow object."""
+    with patch.object(WorkflowUIRecord.indexer, 'client'):
+        return client.patch(
+            '/workflows/{0}'.format(object_id), data=json.dumps(operations),
+            content_type='application/json-patch+json',
+        )
+
+
+@pytest.mark.parametrize('operations,expected', [
+    ([{'op': 'add', 'path': '/metadata/b', 'value': 2}],
+     {'a': 1, 'b': 2, 'c': [1, 2]}),
+    ([{'op': 'replace', 'path': '/metadata/a', 'value': 2}],
+     {'a': 2, 'c': [1, 2]}),
+    ([{'op': 'remove', 'path': '/metadata/c/0'}],
+     {'a': 1, 'c': [2]}),
+    ([{'op': 'move', 'from': '/metadata/a', 'path': '/metadata/b'}],
+     {'b': 1, 'c': [1, 2]}),
+    ([{'op': 'test', 'path': '/metadata/a', 'value': 1},
+      {'op': 'add', 'path': '/metadata/c/-', 'value': 3}],
+     {'a': 1, 'c': [1, 2, 3]}),
+])
+def test_patch(rest_app, operations, expected):
+    """Test patching the metadata of a workflow object."""
+    object_id = _create_object({'a': 1, 'c': [1, 2]})
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    with rest_app.test_client() as client:
+        event.listen(db.engine, 'before_cursor_execute',
+                     before_cursor_execute)
+        try:
+            res = _patch(client, object_id, operations)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute',
+                         before_cursor_execute)
+
+        assert res.status_code == 200
+        assert json.loads(res.get_data(as_text=True))[
+            'metadata'] == expected
+
+    updates = [s for s in statements if s.startswith('UPDATE')]
+    assert len(updates) == 1
+    assert 'data=' in updates[0]
+    assert 'extra_data' not in updates[0]
+    assert 'callback_pos' not in updates[0]
+    db.session.expire_all()
+    assert WorkflowObject.get(object_id).data == expected
+
+
+@pytest.mark.parametrize('operations', [
+    {'op': 'replace', 'path': '/metadata/a', 'value': 2},
+    [{'op': 'replace', 'path': '/id', 'value': 2}],
+    [{'op': 'add', 'path': '/_created', 'value': '2019-01-01'}],
+    [{'op': 'replace', 'path': '', 'value': {}}],
+    [{'op': 'move', 'from': '/id', 'path': '/metadata/id'}],
+    [{'op': 'test', 'path': '/metadata/a', 'value': 2}],
+    [{'op': 'remove', 'path': '/metadata/missing'}],
+    [{'op': 'replace', 'path': 'metadata', 'value': {}}],
+    [{'op': 'unknown', 'path': '/metadata/a'}],
+])
+def test_patch_invalid(rest_app, operations):
+    """Test the rejection of invalid JSON Patches."""
+    object_id = _create_object({'a': 1})
+
+    with rest_app.test_client() as client:
+        assert _patch(client, object_id, operations).status_code == 400
+
+    db.session.expire_all()
+    assert WorkflowObject.get(object_id).data == {'a': 1}
+
+
+def test_batch(rest_app):
+    """Test getting workflow objects in the requested order."""
+    ids = [_create_object({'n': n}) for n in range(3)]
+
+    with rest_app.test_client() as client:
+        res = client.post(
+            '/workflows/batch?fields=metadata',
+            data=json.dumps([ids[2], 0, str(ids[0]), ids[1]]),
+            content_type='application/json',
+        )
+
+        assert res.status_code == 200
+        assert [
+            record['metadata']['n']
+            for record in json.loads(res.get_data(as_text=True))
+        ] == [2, 0, 1]
+
+        res = client.post(
+            '/workflows/batch', data=json.dumps(ids[::-1]),
+            content_type='application/json',
+            headers={'Accept': 'application/x-ndjson'},
+        )
+
+        assert res.status_code == 200
+        assert [
+            json.loads(line)['id']
+            for line in res.get_data(as_text=True).splitlines()
+        ] == ids[::-1]
+
+
+def test_batch_invalid(rest_app):
+    """Test the rejection of invalid batch requests."""
+    def post(data):
+        with rest_app.test_client() as client:
+            return client.post(
+                '/workflows/batch', data=json.dumps(data),
+                content_type='application/json',
+            ).status_code
+
+    assert post({'ids': [1]}) == 400
+    assert post(['a']) == 400
+    assert post([1, None]) == 400
+    assert post([[1]]) == 400
+    assert post(list(range(1001))) == 400
+    assert post(list(range(1000))) == 200
+
+
+def test_iter_records(rest_app):
+    """Test iterating over records queried in chunks."""
+    ids = [_create_object({'n': n}) for n in range(5)]
+    ids = ids[::-1] + [0]
+
+    with patch.object(WorkflowUIRecord, 'get_records',
+                      wraps=WorkflowUIRecord.get_records) as get_records:
+        records = WorkflowUIRecord.iter_records(ids, chunk_size=2)
+
+        assert get_records.call_count == 0
+        assert next(records)['metadata'] == {'n': 4}
+        assert get_records.call_count == 1
+        assert [record['id'] for record in records] == ids[1:-1]
+        assert get_records.call_count == 3
+
+
+@pytest.mark.parametrize('rest_app_config', [dict(
+    REST_MIMETYPE_QUERY_ARG_NAME='format',
+)])
+def test_search_raw(rest_app):
+    """Test that raw searches have their own media type."""
+    raw = '{"hits":{"total":1,"hits":[]}}'
+
+    with rest_app.test_client() as client, \
+            patch('invenio_workflows_ui.views.rest.execute_raw',
+                  return_value=raw) as execute_raw, \
+            patch('invenio_workflows_ui.views.rest.RecordsSearch.execute',
+                  return_value=_search_response(1)):
+        res = client.get('/workflows/')
+
+        assert res.content_type == 'application/json'
+        assert json.loads(res.get_data(as_text=True))[
+            'hits']['total'] == 1
+        assert not execute_raw.called
+
+        res = client.get('/workflows/', headers={
+            'Accept': 'application/vnd.workflows-ui.raw+json'})
+
+        assert res.content_type == 'application/vnd.workflows-ui.raw+json'
+        assert json.loads(res.get_data(as_text=True))['hits'] == {
+            'total': 1, 'hits': []}
+
+        res = client.get('/workflows/?format=raw')
+        data = json.loads(res.get_data(as_text=True))
+
+        assert res.content_type == 'application/vnd.workflows-ui.raw+json'
+        assert 'format=raw' in data['links']['self']
+        assert execute_raw.call_count == 2
+
+
+@pytest.mark.parametrize('media_type,loads', [
+    ('application/msgpack',
+     lambda data: pytest.importorskip('msgpack').unpackb(data, raw=False)),
+    ('application/cbor',
+     lambda data: pytest.importorskip('cbor2').loads(data)),
+])
+def test_item_binary(rest_app, media_type, loads):
+    """Test getting a workflow object as MessagePack or CBOR."""
+    object_id = _create_object({'title': 'foo'})
+    url = '/workflows/{0}'.format(object_id)
+
+    with rest_app.test_client() as client:
+        expected = json.loads(client.get(url).get_data(as_text=True))
+        res = client.get(url, headers={'Accept': media_type})
+
+        assert res.status_code == 200
+        assert res.content_type == media_type
+        assert loads(res.get_data()) == expected
+
+
+def test_export(rest_app):
+    """Test exporting all the matching records."""
+    hits = [
+        {'id': 1, '_workflow': {'status': 'HALTED'}, 'metadata': {}},
+        {'id': 2, '_workflow': {'status': 'ERROR'},
+         'metadata': {'titles': [u'Caf\xe9', 'a,"b"']}},
+    ]
+
+    def scan(search):
+        return (MagicMock(to_dict=MagicMock(return_value=hit))
+                for hit in hits)
+
+    with rest_app.test_client() as client, patch(
+            'invenio_workflows_ui.views.rest.RecordsSearch.scan',
+            autospec=True, side_effect=scan):
+        res = client.get('/workflows/export?status=HALTED')
+
+        assert res.status_code == 200
+        assert res.content_type == 'application/x-ndjson'
+        assert [
+            json.loads(line)
+            for line in res.get_data(as_text=True).splitlines()
+        ] == hits
+
+        res = client.get(
+            '/workflows/export?fields=id,_workflow.status,metadata.titles',
+            headers={'Accept': 'text/csv'})
+
+        assert res.status_code == 200
+        assert list(csv.reader(
+            res.get_data(as_text=True).splitlines())) == [
+            ['id', '_workflow.status', 'metadata.titles'],
+            ['1', 'HALTED', ''],
+            ['2', 'ERROR', json.dumps(hits[1]['metadata']['titles'],
+                                      separators=(',', ':'))],
+        ]
+
+
+def test_summary(rest_app, cache):
+    """Test the cached counts of records per status, type and workflow."""
+    rest_app.extensions['invenio-workflows-ui'].cache = cache
+    searches = []
+
+    def execute(search):
+        searches.append(search.to_dict())
+        return MagicMock(to_dict=MagicMock(return_value={
+            'hits': {'total': 3, 'hits': []},
+            'aggregations': {'status': {'buckets': [
+                {'key': 'HALTED', 'doc_count': 3, 'data_type': {'buckets': [
+                    {'key': 'hep', 'doc_count': 3, 'workflow_name': {
+                        'buckets': [
+                            {'key': 'article', 'doc_count': 2},
+                            {'key': 'author', 'doc_count': 1},
+                        ],
+                    }},
+                ]}},
+            ]}},
+        }))
+
+    with rest_app.test_client() as client, patch(
+            'invenio_workflows_ui.views.rest.RecordsSearch.execute',
+            autospec=True, side_effect=execute):
+        res = client.get('/workflows/summary')
+
+        assert res.status_code == 200
+        assert json.loads(res.get_data(as_text=True)) == {
+            'total': 3,
+            'status': {'HALTED': {'count': 3, 'data_type': {'hep': {
+                'count': 3,
+                'workflow_name': {
+                    'article': {'count': 2},
+                    'author': {'count': 1},
+                },
+            }}}},
+        }
+        assert client.get('/workflows/summary').get_data() == \
+            res.get_data()
+
+    assert len(searches) == 1
+    assert searches[0]['size'] == 0
+    assert searches[0]['aggs']['status']['aggs']['data_type']['aggs'][
+        'workflow_name']['terms']['field'] == '_workflow.workflow_name'
@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2018 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+
+"""Search factories tests."""
+
+from __future__ import absolute_import, print_function
+
+import pytest
+from elasticsearch_dsl import Search
+from flask import request
+
+from invenio_workflows_ui.search import (
+    SearchTemplate,
+    default_facets_factory,
+    default_indices_factory,
+    default_sorter_factory,
+    default_source_filter_factory,
+    get_raw_total_hits,
+    get_total_hits,
+    guard_query_string,
+)
+from invenio_workflows_ui.errors import QueryTooComplexRESTError
+
+
+def test_default_source_filter_factory(app):
+    """Test _source filtering from the request arguments."""
+    with app.test_request_context(
+            '/?fields=_workflow,_created&fields=_updated&exclude=metadata'):
+        search, urlkwargs = default_source_filter_factory(Search())
+
+        assert search.to_dict()['_source'] == {
+            'includes': ['_workflow', '_created', '_updated'],
+            'excludes': ['metadata'],
+        }
+        assert urlkwargs.getlist('fields') == ['_workflow,_created,_updated']
+        assert urlkwargs.getlist('exclude') == ['metadata']
+
+    with app.test_request_context('/'):
+        search, urlkwargs = default_source_filter_factory(Search())
+
+        assert '_source' not in search.to_dict()
+        assert not urlkwargs
+
+
+def test_default_facets_factory_aggs(app):
+    """Test the selection of the aggregations."""
+    with app.test_request_context('/?aggs=status,data_type'):
+        search, urlkwargs = default_facets_factory(Search(), 'workflows')
+
+        assert set(search.to_dict()['aggs']) == {'status', 'data_type'}
+        assert urlkwargs.getlist('aggs') == ['status,data_type']
+
+    with app.test_request_context('/?aggs=none'):
+        search, urlkwargs = default_facets_factory(Search(), 'workflows')
+
+        assert 'aggs' not in search.to_dict()
+
+    with app.test_request_context('/'):
+        search, urlkwargs = default_facets_factory(Search(), 'workflows')
+
+        assert set(search.to_dict()['aggs']) == {
+            'status', 'data_type', 'workflow_name'}
+        assert 'aggs' not in urlkwargs
+
+        search, urlkwargs = default_facets_factory(
+            Search(), 'workflows', aggs=[])
+
+        assert 'aggs' not in search.to_dict()
+
+
+def test_get_total_hits():
+    """Test the total hits of the different response formats."""
+    assert get_total_hits({'hits': {'total': 42}}) == (42, 'eq')
+    assert get_total_hits(
+        {'hits': {'total': {'value': 42, 'relation': 'eq'}}}) == (42, 'eq')
+    assert get_total_hits(
+        {'hits': {'total': {'value': 10000, 'relation': 'gte'}}}
+    ) == (10000, 'gte')
+    assert get_total_hits(
+        {'hits': {'total': 42}, 'terminated_early': True}) == (42, 'gte')
+
+
+def test_get_raw_total_hits():
+    """Test the total hits of raw search responses."""
+    assert get_raw_total_hits(
+        '{"timed_out":false,"hits":{"total":42,"hits":[]}}') == (42, 'eq')
+    assert get_raw_total_hits(
+        '{"timed_out":false,"hits":{"total":{"value":10000,'
+        '"relation":"gte"},"hits":[]}}') == (10000, 'gte')
+    assert get_raw_total_hits(
+        '{"timed_out":true,"hits":{"total":42,"hits":[]}}') == (42, 'gte')
+    assert get_raw_total_hits(
+        '{"timed_out":false,"hits":{"hits":[{"_source":'
+        '{"hits":{"total":3}}}]}}') == (None, 'gte')
+
+
+def test_guard_query_string():
+    """Test the query cost guards."""
+    guards = dict(max_clauses=3, regexps='escape', max_wildcards=1,
+                  wildcards='escape')
+
+    assert guard_query_string('title:foo*', guards) == 'title:foo*'
+    assert guard_query_string('foo* bar*', guards) == 'foo\\* bar\\*'
+    assert guard_query_string('title:/jo.n/', guards) == 'title:\\/jo.n\\/'
+    assert guard_query_string('a OR b AND NOT c', guards) == \
+        'a OR b AND NOT c'
+    assert guard_query_string('title:(a || b) && c', guards) == \
+        'title:(a || b) && c'
+    assert guard_query_string('"a b c d e" f', guards) == '"a b c d e" f'
+    assert guard_query_string('date:[2019 TO *] a', guards) == \
+        'date:[2019 TO *] a'
+    with pytest.raises(QueryTooComplexRESTError):
+        guard_query_string('a OR b OR c OR d', guards)
+
+    guards = dict(regexps='reject', max_wildcards=0, wildcards='reject')
+    with pytest.raises(QueryTooComplexRESTError):
+        guard_query_string('title:/jo.n/', guards)
+    with pytest.raises(QueryTooComplexRESTError):
+        guard_query_string('+/jo.n/', guards)
+    with pytest.raises(QueryTooComplexRESTError):
+        guard_query_string('foo*', guards)
+    with pytest.raises(QueryTooComplexRESTError):
+        guard_query_string('foo\\\\*', guards)
+    assert guard_query_string('foo', guards) == 'foo'
+
+
+def test_guard_query_string_literals():
+    """Test that the query cost guards leave literal characters alone."""
+    guards = dict(max_clauses=2, regexps='reject', max_wildcards=0,
+                  wildcards='reject')
+
+    for query in (
+        'urls.value:"http://arxiv.org/abs/1234"',
+        'url:"https://x.org/?a=1"',
+        '"title: foo* /bar/ AND (baz)" OR qux',
+        'title:"foo \\" bar*"',
+        'path:a/b/c',
+        'title:foo\\* title:\\/jo.n\\/',
+        'title:/unclosed',
+    ):
+        assert guard_query_string(query, guards) == query
+
+
+def test_search_template_sort(app):
+    """Test the sort fields of a compiled search template."""
+    template = SearchTemplate('workflows', app.config)
+
+    with app.test_request_context('/'):
+        search, urlkwargs = default_sorter_factory(Search(), template)
+
+        assert search.to_dict()['sort'] == [{'_updated': {'order': 'desc'}}]
+        assert urlkwargs == {'sort': '-mostrecent'}
+
+    with app.test_request_context('/?sort=mostrecent'):
+        search, urlkwargs = default_sorter_factory(Search(), template)
+
+        assert search.to_dict()['sort'] == [{'_updated': {'order': 'asc'}}]
+
+
+def test_search_template_sort_callable(app):
+    """Test that callable sort fields are evaluated on each search."""
+    def sort_field(asc):
+        return {request.args['field']: {'order': 'asc' if asc else 'desc'}}
+
+    app.config['WORKFLOWS_UI_REST_SORT_OPTIONS'] = dict(workflows=dict(
+        custom=dict(fields=[sort_field, '_updated']),
+    ))
+    template = SearchTemplate('workflows', app.config)
+
+    with app.test_request_context('/?sort=-custom&field=_created'):
+        search, urlkwargs = default_sorter_factory(Search(), template)
+
+        assert search.to_dict()['sort'] == [
+            {'_created': {'order': 'desc'}},
+            {'_updated': {'order': 'desc'}},
+        ]
+
+    with app.test_request_context('/?sort=custom&field=id'):
+        search, urlkwargs = default_sorter_factory(Search(), template)
+
+        assert search.to_dict()['sort'][0] == {'id': {'order': 'asc'}}
+
+
+def test_search_template_aggs(app):
+    """Test that searches do not share the aggregations of a template."""
+    template = SearchTemplate('workflows', app.config)
+
+    with app.test_request_context('/?aggs=status'):
+        search, _ = default_facets_factory(Search(), template)
+        search.aggs['status'].bucket('nested', 'terms', field='id')
+        other, _ = default_facets_factory(Search(), template)
+
+        assert 'aggs' in search.to_dict()['aggs']['status']
+        assert 'aggs' not in other.to_dict()['aggs']['status']
+        assert 'aggs' not in template.aggs['status']
+
+
+def test_default_indices_factory(app):
+    """Test the indices targeted by data type."""
+    app.config['WORKFLOWS_UI_DATA_TYPES'] = dict(
+        hep=dict(search_index='holdingpen-hep'),
+        authors=dict(search_index='holdingpen-authors',
+                     search_alias='authors'),
+    )
+    template = SearchTemplate('workflows', app.config)
+    search = Search(index='workflows')
+
+    with app.test_request_context('/?data_type=hep&data_type=authors'):
+        assert default_indices_factory(search, template)._index == [
+            'authors', 'holdingpen-hep']
+
+    with app.test_request_context('/?data_type=hep&data_type=unknown'):
+        assert default_indices_factory(search, template)._index == [
+            'workflows']
+
+    with app.test_request_context('/'):
+        assert default_indices_factory(search, template)._index == [
+            'workflows']
+
+
+def test_default_indices_factory_cold_index(app):
+    """Test that data types without alias target their cold index too."""
+    app.config['WORKFLOWS_UI_DATA_TYPES'] = dict(
+        hep=dict(search_index='holdingpen-hep',
+                 cold_search_index='holdingpen-hep-cold'),
+        authors=dict(search_index='holdingpen-authors',
+                     cold_search_index='holdingpen-authors-cold',
+                     search_alias='authors'),
+    )
+    template = SearchTemplate('workflows', app.config)
+    search = Search(index='workflows')
+
+    with app.test_request_context('/?data_type=hep'):
+        assert default_indices_factory(search, template)._index == [
+            'holdingpen-hep', 'holdingpen-hep-cold']
+
+    with app.test_request_context('/?data_type=hep&data_type=authors'):
+        assert default_indices_factory(search, template)._index == [
+            'authors', 'holdingpen-hep', 'holdingpen-hep-cold']
+
+
+def test_default_indices_factory_list_index(app):
+    """Test the list indices targeted by data type."""
+    app.config['WORKFLOWS_UI_DATA_TYPES'] = dict(
+        hep=dict(search_index='holdingpen-hep',
+                 list_search_index='holdingpen-hep-list'),
+        authors=dict(search_index='holdingpen-authors'),
+    )
+    template = SearchTemplate('workflows', app.config, list_index=True)
+    search = Search(index='workflows-list')
+
+    with app.test_request_context('/?data_type=hep&data_type=authors'):
+        assert default_indices_factory(search, template)._index == [
+            'holdingpen-authors', 'holdingpen-hep-list']
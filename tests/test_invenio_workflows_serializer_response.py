@@ -27,10 +27,14 @@
 
 from __future__ import absolute_import, division, print_function
 
+import zlib
 from datetime import datetime
+
+import pytest
 from mock import MagicMock
 
-from invenio_workflows_ui.serializers.response import workflow_responsify
+from invenio_workflows_ui.serializers.response import compress_response, \
+    workflow_responsify
 
 
 class TestSerializer(object):
@@ -53,4 +57,70 @@ def test_workflow_responsify(app):
         assert resp.status_code == 200
         assert resp.content_type == 'application/json'
         assert resp.get_data(as_text=True) == "Jessica Jones"
-        assert 'Etag' in resp.headers
+        assert resp.get_etag()[1] is True
+
+
+def test_workflow_responsify_compression(app):
+    """Test the compression of the responses."""
+    app.config['WORKFLOWS_UI_REST_COMPRESSION_ENCODINGS'] = ['gzip']
+    rec_serializer = workflow_responsify(TestSerializer(), 'application/json')
+    rec = MagicMock(
+        model=MagicMock(modified=datetime.now()), title='Jessica Jones' * 100)
+
+    with app.test_request_context(headers={'Accept-Encoding': 'gzip'}):
+        resp = rec_serializer(rec)
+
+        assert resp.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in resp.vary
+        assert zlib.decompress(resp.get_data(), 16 + zlib.MAX_WBITS) == \
+            b'Jessica Jones' * 100
+        assert resp.get_etag()[1] is True
+
+    with app.test_request_context():
+        resp = rec_serializer(rec)
+
+        assert 'Content-Encoding' not in resp.headers
+        assert resp.get_data(as_text=True) == 'Jessica Jones' * 100
+
+
+def _gzip_decompressor():
+    """Get a gzip decompress function."""
+    return zlib.decompressobj(16 + zlib.MAX_WBITS).decompress
+
+
+def _brotli_decompressor():
+    """Get a brotli decompress function."""
+    return pytest.importorskip('brotli').Decompressor().process
+
+
+@pytest.mark.parametrize('encoding,decompressor', [
+    ('gzip', _gzip_decompressor),
+    ('br', _brotli_decompressor),
+])
+def test_compress_stream(app, encoding, decompressor):
+    """Test that streamed bodies are flushed while being compressed."""
+    decompress = decompressor()
+    app.config.update(
+        WORKFLOWS_UI_REST_COMPRESSION_ENCODINGS=[encoding],
+        WORKFLOWS_UI_REST_COMPRESSION_LEVELS={},
+        WORKFLOWS_UI_REST_COMPRESSION_FLUSH_SIZE=10,
+    )
+    chunks = [u'a' * 6, u'b' * 6, u'c' * 3, u'd' * 20]
+    produced = []
+
+    def produce():
+        for chunk in chunks:
+            produced.append(chunk)
+            yield chunk
+
+    with app.test_request_context(headers={'Accept-Encoding': encoding}):
+        resp = compress_response(app.response_class(produce()))
+        received = {}
+        body = b''
+        for data in resp.response:
+            body += decompress(data)
+            received[len(produced)] = body
+
+        assert resp.headers['Content-Encoding'] == encoding
+        assert received[2] == b'a' * 6 + b'b' * 6
+        assert body == u''.join(chunks).encode('utf-8')
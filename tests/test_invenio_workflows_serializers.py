@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2019 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+
+"""Serializer tests."""
+
+from __future__ import absolute_import, print_function
+
+import json
+import uuid
+
+import pytest
+from mock import MagicMock, patch
+
+from invenio_workflows_ui.config import _binary_serializers
+from invenio_workflows_ui.serializers.binary import CBORSerializer, \
+    MessagePackSerializer
+from invenio_workflows_ui.serializers.json import JSON_BACKENDS, \
+    JSONSerializer, _json_backends, json_dumps
+
+RECORD = {
+    'id': 1,
+    '_workflow': {'status': 'HALTED', 'workflow_position': [0, 1]},
+    'metadata': {'title': u'Caf\xe9', 'count': 2.5, 'tags': None},
+    '_extra_data': {'flags': [True, False], 'big': 2 ** 40},
+}
+
+
+def _record():
+    """Build a workflow record returning RECORD."""
+    return MagicMock(dumps=MagicMock(return_value=RECORD))
+
+
+@pytest.mark.parametrize('serializer,loads', [
+    (MessagePackSerializer(),
+     lambda data: pytest.importorskip('msgpack').unpackb(data, raw=False)),
+    (CBORSerializer(), lambda data: pytest.importorskip('cbor2').loads(data)),
+])
+def test_binary_serializers(app, serializer, loads):
+    """Test that the binary serializers encode the JSON documents."""
+    with app.test_request_context():
+        expected = json.loads(JSONSerializer().serialize(_record()))
+
+        assert loads(serializer.serialize(_record())) == expected
+        assert loads(serializer.serialize_action({'a': [1]})) == {'a': [1]}
+
+
+def test_binary_serializers_registered():
+    """Test that only the installed binary serializers are registered."""
+    def import_module(name):
+        if name == 'cbor2':
+            raise ImportError(name)
+
+    with patch('invenio_workflows_ui.config.import_module',
+               side_effect=import_module):
+        assert _binary_serializers('search_serializer') == {
+            'application/msgpack': ('invenio_workflows_ui.serializers'
+                                    ':msgpack_search_serializer'),
+        }
+
+
+@pytest.mark.parametrize('backend', [
+    'flask', 'orjson', 'ujson', 'rapidjson', 'json:dumps'])
+def test_json_backends(app, backend):
+    """Test that the JSON backends encode the same documents."""
+    if backend in JSON_BACKENDS and backend != 'flask':
+        pytest.importorskip(backend)
+    app.config['WORKFLOWS_UI_JSON_BACKEND'] = backend
+    object_id = uuid.uuid4()
+
+    with app.test_request_context(), patch.dict(_json_backends, clear=True):
+        assert json.loads(JSONSerializer().serialize(_record())) == RECORD
+        if backend != 'json:dumps':
+            assert json.loads(json_dumps({'id': object_id})) == {
+                'id': str(object_id)}
+
+
+def test_json_backend_missing(app):
+    """Test that a missing JSON backend falls back to Flask's."""
+    def missing():
+        raise ImportError('missing')
+
+    app.config['WORKFLOWS_UI_JSON_BACKEND'] = 'missing'
+
+    with app.test_request_context(), \
+            patch.dict(_json_backends, clear=True), \
+            patch.dict(JSON_BACKENDS, missing=missing):
+        assert json.loads(json_dumps(RECORD)) == RECORD
+        assert _json_backends['missing'] is JSON_BACKENDS['flask']()
+
+
+def _join(chunks):
+    """Join the text or bytes chunks of a streamed body."""
+    return u''.join(
+        chunk.decode('utf-8') if isinstance(chunk, bytes) else chunk
+        for chunk in chunks
+    )
+
+
+@pytest.mark.parametrize('backend', ['flask', 'orjson'])
+@pytest.mark.parametrize('hits', [[], [RECORD, {'id': 2}]])
+def test_search_stream(app, backend, hits):
+    """Test that streamed searches encode the same documents."""
+    if backend != 'flask':
+        pytest.importorskip(backend)
+    app.config['WORKFLOWS_UI_JSON_BACKEND'] = backend
+    search_result = {
+        'hits': {'total': len(hits), 'hits': hits},
+        'aggregations': {'status': {'buckets': []}},
+        'timed_out': True,
+    }
+    links = {'self': 'http://localhost/workflows/?page=1'}
+    serializer = JSONSerializer()
+
+    with app.test_request_context(), patch.dict(_json_backends, clear=True):
+        expected = json.loads(
+            serializer.serialize_search(search_result, links=links))
+        assert json.loads(_join(serializer.serialize_search_stream(
+            search_result, links=links))) == expected
+        assert json.loads(_join(serializer.serialize_stream(hits))) == hits
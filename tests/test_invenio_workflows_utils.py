@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2019 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+
+"""Utilities tests."""
+
+from __future__ import absolute_import, print_function
+
+from invenio_workflows_ui.utils import get_fields, pop_field
+
+
+def test_get_fields():
+    """Test copying dotted fields."""
+    data = {
+        'id': 1,
+        '_workflow': {'status': 'HALTED', 'data_type': 'hep'},
+        'metadata': {'titles': [{'title': 'Foo'}]},
+    }
+
+    assert get_fields(data, ['id', '_workflow.status', 'metadata.missing']) \
+        == {'id': 1, '_workflow': {'status': 'HALTED'}}
+
+
+def test_pop_field():
+    """Test removing dotted fields."""
+    data = {'_workflow': {'status': 'HALTED'}, 'metadata': {'titles': []}}
+
+    pop_field(data, 'metadata.titles')
+    pop_field(data, '_workflow.status.missing')
+    pop_field(data, 'missing')
+
+    assert data == {'_workflow': {'status': 'HALTED'}, 'metadata': {}}